@@ -0,0 +1,240 @@
+# benchmark suite timing the renderers from single operations up to whole frames, writing the results as JSON
+# example: python benchmark.py --output results.json
+# example: python benchmark.py --quick --only realtime --meshes cube cat
+# import necessary modules
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # realtime frames are drawn to an off-screen surface
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "" # hide pygame support prompt
+import argparse
+import json
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import timeit
+import numpy as np
+import pygame
+# import custom renderers
+from realtimeRenderer import RealtimeRenderer, Triangle as RealtimeTriangle, Sphere as RealtimeSphere
+from staticRenderer import StaticRenderer, Ray, Sphere as StaticSphere, Triangle as StaticTriangle
+from objParser import parseObj
+from meshCache import loadMesh
+from sampling import tileSampler
+# import custom utility functions and structures
+from utilities import *
+
+bundledMeshes = ["cube", "icosahedron", "Duck_01", "donut", "cat", "oscar", "mrmadman", "model"]
+meshDirectory = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # the bundled meshes sit next to the 3DStudio folder
+sceneSizes = [100, 1000, 10000, 100000] # triangle counts of the synthetic scenes
+quickSceneSizes = [100, 1000]
+
+def measure(function, repeats, number=1): # times a function, returning the seconds per call of each repeat
+    return [t / number for t in timeit.repeat(function, number=number, repeat=repeats)]
+
+def result(group, name, times, **params): # summarises the timings of one benchmark
+    return {"group": group, "name": name, "params": params, "best": min(times), "mean": sum(times) / len(times),
+            "median": float(np.median(times)), "repeats": len(times)}
+
+def syntheticScene(triangleCount, seed=0, sphereRatio=100, size=120): # returns a reproducible realtime scene of random triangles and spheres
+    # small triangles scattered through a cube in front of the camera, with one sphere for every sphereRatio triangles
+    rng = random.Random(seed)
+    shapes = []
+    for _ in range(triangleCount):
+        centre = Vect(rng.uniform(-size, size) / 2, rng.uniform(-size, size) / 2, rng.uniform(-size, size) / 2)
+        corners = [centre + Vect(rng.uniform(-4, 4), rng.uniform(-4, 4), rng.uniform(-4, 4)) for _ in range(3)]
+        shapes.append(RealtimeTriangle(corners[0], corners[1], corners[2], (rng.random(), rng.random(), rng.random()), ["Triangle", 0, 0]))
+    for _ in range(max(1, triangleCount // sphereRatio)):
+        centre = Vect(rng.uniform(-size, size) / 2, rng.uniform(-size, size) / 2, rng.uniform(-size, size) / 2)
+        shapes.append(RealtimeSphere(centre, rng.uniform(1, 6), (rng.random(), rng.random(), rng.random()), ["Sphere", rng.random(), 0]))
+    return shapes
+
+def meshScene(name): # loads a bundled mesh as realtime shapes, scaled to fill the view
+    path = os.path.join(meshDirectory, name + ".obj")
+    vertices, _ = loadMesh(path)
+    extent = float(np.ptp(vertices, axis=0).max()) if len(vertices) else 1
+    renderer = realtimeRenderer(pygame.Surface((1, 1)))
+    return unnest(renderer.load(path, 100 / max(extent, 1e-9), (1, 1, 1), ["Triangle", 0, 0]))
+
+def realtimeRenderer(surface, backend="painter"): # returns a realtime renderer with the editor's settings, looking straight at the origin
+    renderer = RealtimeRenderer(surface, 300, Vect(0, 0, 1000), 2000, (1, 1, 1.7), 0.8, (85, 0, 0), False, backend)
+    renderer.rotationLock = True
+    renderer.update()
+    return renderer
+
+def staticRenderer(shapes, width, height, integrator, sampler="random", seed=0): # returns a static renderer of a scene using a single worker, so results are comparable across machines
+    return StaticRenderer(width, height, (0, 0, 0), None, shapes, (1, 1, 1.7), 0.8, integrator=integrator, workers=1, seed=seed, sampler=sampler)
+
+def vectBenchmarks(repeats): # times single vector operations
+    a = Vect(1.5, -2.25, 3.0)
+    b = Vect(0.5, 4.0, -1.75)
+    accumulator = Vect(0, 0, 0)
+    def accumulate():
+        nonlocal accumulator
+        accumulator += b
+    operations = {"create": lambda: Vect(1.0, 2.0, 3.0),
+                  "add": lambda: a + b,
+                  "sub": lambda: a - b,
+                  "mul scalar": lambda: a * 0.5,
+                  "mul vector": lambda: a * b,
+                  "div scalar": lambda: a / 3.0,
+                  "dot": lambda: a.dot(b),
+                  "cross": lambda: a.cross(b),
+                  "mag": lambda: a.mag(),
+                  "normalise": lambda: a.normalise(),
+                  "add in place": accumulate}
+    return [result("vect", name, measure(operation, repeats, 100000)) for name, operation in operations.items()]
+
+def rayBenchmarks(repeats): # times single ray intersections against a sphere and a triangle, for rays that hit and miss
+    sphere = StaticSphere(Vect(0, 0, -10), 2, Vect(1, 1, 1), 0, 0)
+    triangle = StaticTriangle(Vect(-2, -2, -10), Vect(2, -2, -10), Vect(0, 2, -10), Vect(1, 1, 1), 0, 0)
+    hit = Ray(Vect(0, 0, 0), Vect(0.01, 0.02, -1))
+    miss = Ray(Vect(0, 0, 0), Vect(1, 1, -1))
+    return [result("ray", "hitSphere", measure(lambda: hit.hitSphere(sphere), repeats, 20000), hit=True),
+            result("ray", "hitSphere", measure(lambda: miss.hitSphere(sphere), repeats, 20000), hit=False),
+            result("ray", "hitTriangle", measure(lambda: hit.hitTriangle(triangle), repeats, 20000), hit=True),
+            result("ray", "hitTriangle", measure(lambda: miss.hitTriangle(triangle), repeats, 20000), hit=False)]
+
+def shadingBenchmarks(repeats, sizes): # times finding the closest hit of a ray and shading one path, over scenes of increasing size
+    results = []
+    for size in sizes:
+        renderer = staticRenderer(syntheticScene(size), 64, 36, "path")
+        renderer.compileScene()
+        ray = Ray(Vect(0, 0, 0), Vect(0.01, 0.02, -1))
+        # testing every object is only practical in small scenes
+        if size <= 1000:
+            results.append(result("shading", "findRayHit", measure(lambda: StaticRenderer.findRayHit(renderer.objects, ray), repeats, 10),
+                                  triangles=size, structure="list"))
+        results.append(result("shading", "findRayHit", measure(lambda: StaticRenderer.findRayHit(renderer.bvh, ray), repeats, 200),
+                              triangles=size, structure="bvh"))
+        # a new stream for each timing so every repeat follows the same paths
+        def shade():
+            sampler = tileSampler("random", 0, 0, 28, 18, 8, 1, 1, 5)
+            for x in range(8):
+                StaticRenderer.pixelShader((renderer.bvh, 28 + x, 18, 5, 64, 36, (1, 1, 1.7), 0.8, sampler.path(x, 0, 0)))
+        results.append(result("shading", "pixelShader", measure(shade, repeats, 1), triangles=size, paths=8))
+    return results
+
+def sortBenchmarks(repeats): # times the merge sort used for depth ordering
+    results = []
+    for size in [1000, 10000]:
+        rng = random.Random(0)
+        items = [[index, rng.random()] for index in range(size)]
+        results.append(result("sort", "mergeSort", measure(lambda: mergeSort(list(items), True, 1), repeats), items=size))
+    return results
+
+def loadBenchmarks(repeats, meshes): # times reading each bundled mesh, from the text file, from its binary cache and into shape objects
+    results = []
+    renderer = realtimeRenderer(pygame.Surface((1, 1)))
+    for name in meshes:
+        path = os.path.join(meshDirectory, name + ".obj")
+        faces = len(parseObj(path)[1])
+        results.append(result("load", "parseObj", measure(lambda: parseObj(path), repeats), mesh=name, faces=faces))
+        loadMesh(path) # make sure the cache exists before timing cached loads
+        results.append(result("load", "loadMesh", measure(lambda: loadMesh(path), repeats), mesh=name, faces=faces))
+        results.append(result("load", "realtime load", measure(lambda: renderer.load(path, 1, (1, 1, 1), ["Triangle", 0, 0]), repeats), mesh=name, faces=faces))
+    return results
+
+def realtimeBenchmarks(repeats, scenes): # times realtime frames of each scene, with and without the levels of detail already built
+    results = []
+    surface = pygame.Surface((810, 540))
+    for label, shapes in scenes:
+        for backend in ["painter", "zbuffer"]:
+            def coldFrame():
+                realtimeRenderer(surface, backend).render(shapes)
+            renderer = realtimeRenderer(surface, backend)
+            renderer.render(shapes)
+            results.append(result("realtime", "first frame", measure(coldFrame, repeats), scene=label, shapes=len(shapes), backend=backend))
+            results.append(result("realtime", "frame", measure(lambda: renderer.render(shapes), repeats, 3), scene=label, shapes=len(shapes),
+                                  backend=backend, drawn=renderer.lastPolyCount))
+    return results
+
+def staticBenchmarks(repeats, scenes, integrator, width=64, height=36): # times one full static rendering pass of each scene
+    results = []
+    output = os.path.join(tempfile.gettempdir(), "benchmark.png")
+    for label, shapes in scenes:
+        passTimes = []
+        totalTimes = []
+        for _ in range(repeats):
+            renderer = staticRenderer(shapes, width, height, integrator)
+            start = time.perf_counter()
+            renderer.render(targetSamples=1, output=output)
+            totalTimes.append(time.perf_counter() - start)
+            passTimes.append(renderer.frameTimes[0])
+        # the whole render includes compiling the scene and starting the worker, while a pass only shades the image
+        results.append(result("static", "pass", passTimes, scene=label, shapes=len(shapes), integrator=integrator, width=width, height=height))
+        results.append(result("static", "render", totalTimes, scene=label, shapes=len(shapes), integrator=integrator, width=width, height=height))
+    return results
+
+def convergenceBenchmarks(sampleCounts, referenceSamples, width=48, height=32): # times each sampler reaching increasing sample counts, measuring the error left
+    # the wavefront integrator is used since it draws on the samplers in the same way as the path integrator, only faster
+    shapes = syntheticScene(300)
+    output = os.path.join(tempfile.gettempdir(), "benchmark.png")
+    def render(sampler, samples, seed):
+        renderer = staticRenderer(shapes, width, height, "wavefront", sampler, seed)
+        renderer.samplesPerTask = min(samples, 16)
+        start = time.perf_counter()
+        renderer.render(targetSamples=samples, output=output)
+        return (time.perf_counter() - start, renderer.accumulationBuffer / renderer.frames)
+    # the reference uses a different seed, so its own noise is unrelated to the images it is compared with
+    _, reference = render("random", referenceSamples, 1)
+    results = []
+    for sampler in ["random", "halton"]:
+        for samples in sampleCounts:
+            seconds, image = render(sampler, samples, 0)
+            error = float(np.sqrt(((image - reference) ** 2).mean()))
+            results.append(result("convergence", sampler, [seconds], samples=samples, rmse=error, referenceSamples=referenceSamples))
+    return results
+
+def environment(): # describes the machine and code being measured, so results from different commits can be compared
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__, "pygame": pygame.version.ver,
+            "platform": platform.platform(), "processor": platform.processor(), "cpus": os.cpu_count(), "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+def runSuite(groups, meshes, quick=False, integrator="path", log=print): # runs the chosen benchmark groups, returning every result
+    repeats = 3 if quick else 7
+    macroRepeats = 1 if quick else 3
+    sizes = quickSceneSizes if quick else sceneSizes
+    # scenes are built once and shared by every macro benchmark
+    scenes = []
+    if {"realtime", "static"} & set(groups):
+        scenes = [(name, meshScene(name)) for name in meshes] + [(f"synthetic {size}", syntheticScene(size)) for size in sizes]
+    suite = {"vect": lambda: vectBenchmarks(repeats),
+             "ray": lambda: rayBenchmarks(repeats),
+             "shading": lambda: shadingBenchmarks(repeats, [size for size in sizes if size <= 10000]),
+             "sort": lambda: sortBenchmarks(repeats),
+             "load": lambda: loadBenchmarks(macroRepeats, meshes),
+             "realtime": lambda: realtimeBenchmarks(macroRepeats, scenes),
+             # static passes over the largest scenes take minutes, so only scenes up to 10000 shapes are rendered
+             "static": lambda: staticBenchmarks(macroRepeats, [(label, shapes) for label, shapes in scenes if len(shapes) <= 11000], integrator),
+             "convergence": lambda: convergenceBenchmarks([1, 4, 16] if quick else [1, 4, 16, 64, 256], 256 if quick else 2048)}
+    results = []
+    for group in groups:
+        start = time.perf_counter()
+        results.extend(suite[group]())
+        log(f"{group:<12}{timer(start):8.2f}s")
+    return results
+
+def main(argv=None):
+    groups = ["vect", "ray", "shading", "sort", "load", "realtime", "static", "convergence"]
+    parser = argparse.ArgumentParser(description="Time the renderers' hot paths and write the results as JSON.")
+    parser.add_argument("--output", default="benchmark.json", help="path of the JSON file to write")
+    parser.add_argument("--only", nargs="+", choices=groups, default=groups, help="benchmark groups to run")
+    parser.add_argument("--meshes", nargs="+", choices=bundledMeshes, default=bundledMeshes, help="bundled meshes to load and render")
+    parser.add_argument("--integrator", choices=["path", "wavefront"], default="path", help="integrator used for static passes")
+    parser.add_argument("--quick", action="store_true", help="fewer repeats and smaller synthetic scenes")
+    arguments = parser.parse_args(argv)
+
+    pygame.display.init() # needed to read the mouse position when updating the realtime renderer
+    results = runSuite(arguments.only, arguments.meshes, arguments.quick, arguments.integrator)
+    with open(arguments.output, "w") as file:
+        json.dump({"environment": environment(), "results": results}, file, indent=1)
+    for entry in results:
+        params = ", ".join(f"{key}={value}" for key, value in entry["params"].items())
+        print(f"{entry['group']:<12}{entry['name']:<16}{entry['best'] * 1000:12.4f} ms  {params}")
+
+if __name__ == "__main__":
+    main()
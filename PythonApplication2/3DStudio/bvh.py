@@ -0,0 +1,244 @@
+# import necessary libraries
+import numpy as np
+
+# relative costs used by the surface area heuristic
+traversalCost = 1.0
+intersectionCost = 1.0
+
+def surfaceArea(boxMin, boxMax): # returns the surface area of an axis-aligned box (works on arrays of boxes)
+    extent = np.maximum(boxMax - boxMin, 0)
+    return 2 * (extent[..., 0] * extent[..., 1] + extent[..., 1] * extent[..., 2] + extent[..., 2] * extent[..., 0])
+
+class BVH: # bounding volume hierarchy of axis-aligned boxes around the primitives of a compiled scene
+    def __init__(self, scene, leafSize=4, maxLeafSize=16, bins=12):
+        self.scene = scene
+        self.leafSize = leafSize # nodes at or below this size always become leaves
+        self.maxLeafSize = maxLeafSize # nodes above this size are always split if possible
+        self.bins = bins # number of bins evaluated per axis by the surface area heuristic
+        # each node is stored as a flat tuple for fast unpacking during traversal:
+        # (minX, minY, minZ, maxX, maxY, maxZ, leftChild, rightChild, start, count)
+        # leaves have a leftChild of -1 and reference the range start:start+count of the primitive list
+        self.nodes = []
+        self.primitives = [] # primitive numbers of the scene, reordered so every leaf covers a contiguous range
+        self.primitiveRank = [] # original position of each primitive in the object list, used to break ties
+        if len(scene) > 0:
+            self.build()
+        self.pack()
+
+    def build(self): # builds the hierarchy top-down using a binned surface area heuristic
+        boxMin, boxMax = self.scene.bounds()
+        # pad boxes slightly so rounding in the intersection tests can never miss a primitive
+        pad = (np.abs(boxMin).max() + np.abs(boxMax).max()) * 1e-9 + 1e-9
+        boxMin -= pad
+        boxMax += pad
+        centroids = (boxMin + boxMax) / 2
+
+        order = []
+        # each stack entry holds the primitive indices of a node and the position of that node in the list
+        stack = [(np.arange(len(self.scene)), self.addNode())]
+        while stack:
+            indices, node = stack.pop()
+            nodeMin = boxMin[indices].min(axis=0)
+            nodeMax = boxMax[indices].max(axis=0)
+            split = self.findSplit(indices, boxMin, boxMax, centroids, nodeMin, nodeMax)
+
+            if split is None:
+                # store the primitives of the node as a leaf
+                self.nodes[node] = (*nodeMin.tolist(), *nodeMax.tolist(), -1, -1, len(order), len(indices))
+                order.extend(indices.tolist())
+            else:
+                leftIndices, rightIndices = split
+                left, right = self.addNode(), self.addNode()
+                self.nodes[node] = (*nodeMin.tolist(), *nodeMax.tolist(), left, right, 0, 0)
+                stack.append((rightIndices, right))
+                stack.append((leftIndices, left))
+
+        self.primitives = order
+        self.primitiveRank = self.scene.order[order].tolist()
+
+    def pack(self): # stores the nodes and primitive lists as arrays for tracing many rays at once
+        nodes = np.array(self.nodes, dtype=np.float64).reshape(-1, 10)
+        self.nodeMin = nodes[:, 0:3]
+        self.nodeMax = nodes[:, 3:6]
+        self.nodeLeft = nodes[:, 6].astype(np.int64)
+        self.nodeRight = nodes[:, 7].astype(np.int64)
+        self.nodeStart = nodes[:, 8].astype(np.int64)
+        self.nodeCount = nodes[:, 9].astype(np.int64)
+        self.primitiveArray = np.array(self.primitives, dtype=np.int64)
+        self.rankArray = np.array(self.primitiveRank, dtype=np.int64)
+
+    def addNode(self): # reserves space for a node and returns its position
+        self.nodes.append(None)
+        return len(self.nodes) - 1
+
+    def findSplit(self, indices, boxMin, boxMax, centroids, nodeMin, nodeMax): # returns the cheapest partition of a node, or None for a leaf
+        count = len(indices)
+        if count <= self.leafSize:
+            return None
+
+        parentArea = surfaceArea(nodeMin, nodeMax)
+        centroidMin = centroids[indices].min(axis=0)
+        centroidMax = centroids[indices].max(axis=0)
+        bestCost, bestAxis, bestBin, bestBins = float("inf"), None, None, None
+
+        for axis in range(3):
+            extent = centroidMax[axis] - centroidMin[axis]
+            if extent <= 0:
+                continue # all centroids lie on one plane along this axis, so it cannot be split
+            # assign each primitive to a bin along the axis by its centroid
+            binIds = ((centroids[indices, axis] - centroidMin[axis]) / extent * self.bins).astype(np.int64)
+            binIds = np.minimum(binIds, self.bins - 1)
+            # gather the count and bounding box of every bin
+            binCounts = np.bincount(binIds, minlength=self.bins)
+            binMin = np.full((self.bins, 3), np.inf)
+            binMax = np.full((self.bins, 3), -np.inf)
+            np.minimum.at(binMin, binIds, boxMin[indices])
+            np.maximum.at(binMax, binIds, boxMax[indices])
+            # sweep from both sides to get the boxes either side of each of the bins - 1 split planes
+            leftCounts = np.cumsum(binCounts)[:-1]
+            rightCounts = count - leftCounts
+            leftArea = surfaceArea(np.minimum.accumulate(binMin)[:-1], np.maximum.accumulate(binMax)[:-1])
+            rightArea = surfaceArea(np.minimum.accumulate(binMin[::-1])[::-1][1:], np.maximum.accumulate(binMax[::-1])[::-1][1:])
+            with np.errstate(invalid="ignore"):
+                costs = traversalCost + intersectionCost * (leftArea * leftCounts + rightArea * rightCounts) / max(parentArea, 1e-30)
+            # splits leaving one side empty are not valid
+            costs[(leftCounts == 0) | (rightCounts == 0)] = np.inf
+            splitBin = int(np.argmin(costs))
+            if costs[splitBin] < bestCost:
+                bestCost, bestAxis, bestBin, bestBins = costs[splitBin], axis, splitBin, binIds
+
+        if bestAxis is None:
+            return None # every centroid is identical, so no split can separate the primitives
+        if bestCost >= intersectionCost * count and count <= self.maxLeafSize:
+            return None # intersecting every primitive directly is cheaper than splitting
+
+        mask = bestBins <= bestBin
+        return (indices[mask], indices[~mask])
+
+    def findRayHit(self, ray): # returns the distance to the closest intersection of a ray and the primitive hit, matching a linear scan
+        # returns (inf, -1) if nothing is hit
+        closestDist, closestPrimitive, closestRank = float("inf"), -1, len(self.primitives)
+        if not self.nodes:
+            return (closestDist, closestPrimitive)
+
+        ox, oy, oz = ray.origin.x, ray.origin.y, ray.origin.z
+        # inverse direction for the slab test, substituting a huge value for zero components
+        ix = 1 / ray.direction.x if ray.direction.x != 0 else 1e300
+        iy = 1 / ray.direction.y if ray.direction.y != 0 else 1e300
+        iz = 1 / ray.direction.z if ray.direction.z != 0 else 1e300
+        nodes = self.nodes
+        primitives = self.primitives
+        primitiveRank = self.primitiveRank
+        distance = self.scene.distance
+
+        # stack of nodes still to visit, each with the distance at which the ray enters its box
+        stack = [(0, 0.0)]
+        while stack:
+            node, entry = stack.pop()
+            # skip the node if a closer hit has been found since it was pushed
+            if entry > closestDist:
+                continue
+            minX, minY, minZ, maxX, maxY, maxZ, left, right, start, count = nodes[node]
+
+            if left == -1:
+                # test the ray against every primitive in the leaf
+                for i in range(start, start + count):
+                    dist = distance(primitives[i], ray.origin, ray.direction)
+                    # ties are broken by original order so the result is identical to a linear scan
+                    if dist is not None and (dist < closestDist or (dist == closestDist and primitiveRank[i] < closestRank)):
+                        closestDist, closestPrimitive, closestRank = dist, primitives[i], primitiveRank[i]
+                continue
+
+            # find where the ray enters each child box, visiting the nearer one first
+            leftEntry = self.boxEntry(nodes[left], ox, oy, oz, ix, iy, iz, closestDist)
+            rightEntry = self.boxEntry(nodes[right], ox, oy, oz, ix, iy, iz, closestDist)
+            if leftEntry is not None and rightEntry is not None:
+                if leftEntry <= rightEntry:
+                    stack.append((right, rightEntry))
+                    stack.append((left, leftEntry))
+                else:
+                    stack.append((left, leftEntry))
+                    stack.append((right, rightEntry))
+            elif leftEntry is not None:
+                stack.append((left, leftEntry))
+            elif rightEntry is not None:
+                stack.append((right, rightEntry))
+
+        return (closestDist, closestPrimitive)
+
+    def findRayHits(self, origins, directions): # returns the closest intersections of many rays at once, matching findRayHit
+        # returns arrays of distance (inf for a miss), surface normal, colour, shine and emission for each ray
+        count = len(origins)
+        bestDist = np.full(count, np.inf)
+        bestRank = np.full(count, len(self.primitives), dtype=np.int64) # original position of the closest primitive
+        bestPrimitive = np.full(count, -1, dtype=np.int64)
+        if count > 0 and self.nodes:
+            # inverse direction for the slab test, substituting a huge value for zero components
+            with np.errstate(divide="ignore"):
+                inverse = np.where(directions != 0, 1 / directions, 1e300)
+            # every ray starts at the root node, and each pass replaces ray-node pairs with the pairs of their children
+            rays = np.arange(count)
+            nodes = np.zeros(count, dtype=np.int64)
+            while len(rays) > 0:
+                # drop pairs whose box is missed or lies beyond the closest hit found so far
+                t1 = (self.nodeMin[nodes] - origins[rays]) * inverse[rays]
+                t2 = (self.nodeMax[nodes] - origins[rays]) * inverse[rays]
+                near = np.maximum(np.minimum(t1, t2).max(axis=1), 0)
+                far = np.minimum(np.maximum(t1, t2).min(axis=1), bestDist[rays])
+                visit = near <= far
+                rays, nodes = rays[visit], nodes[visit]
+
+                leaf = self.nodeLeft[nodes] == -1
+                if leaf.any():
+                    self.intersectLeaves(origins, directions, rays[leaf], nodes[leaf], bestDist, bestRank, bestPrimitive)
+                inner = ~leaf
+                rays = np.concatenate((rays[inner], rays[inner]))
+                nodes = np.concatenate((self.nodeLeft[nodes[inner]], self.nodeRight[nodes[inner]]))
+
+        # gather the surface information of the closest hits
+        hit = bestPrimitive >= 0
+        normals = np.zeros((count, 3))
+        colours = np.zeros((count, 3))
+        shine = np.zeros(count)
+        emission = np.zeros(count)
+        hitPoints = origins[hit] + directions[hit] * bestDist[hit, None]
+        normals[hit], colours[hit], shine[hit], emission[hit] = self.scene.surfaces(bestPrimitive[hit], hitPoints)
+        return (bestDist, normals, colours, shine, emission)
+
+    def intersectLeaves(self, origins, directions, rays, nodes, bestDist, bestRank, bestPrimitive): # tests rays against every primitive of their leaf, updating the closest hits
+        # expand each ray-leaf pair into one ray-primitive pair per primitive in the leaf
+        counts = self.nodeCount[nodes]
+        pairRays = np.repeat(rays, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        pairSlots = np.repeat(self.nodeStart[nodes], counts) + offsets
+        dist = self.scene.distances(self.primitiveArray[pairSlots], origins[pairRays], directions[pairRays])
+
+        # find the closest hit of each ray among its pairs, breaking ties by original order like a linear scan
+        closest = np.full(len(bestDist), np.inf)
+        np.minimum.at(closest, pairRays, dist)
+        isClosest = np.isfinite(dist) & (dist == closest[pairRays])
+        closestRank = np.full(len(bestDist), len(self.primitives), dtype=np.int64)
+        np.minimum.at(closestRank, pairRays[isClosest], self.rankArray[pairSlots[isClosest]])
+        closer = (closest < bestDist) | ((closest == bestDist) & (closestRank < bestRank))
+        # record the primitive of each pair that won for a ray that got closer
+        winner = isClosest & closer[pairRays] & (self.rankArray[pairSlots] == closestRank[pairRays])
+        bestPrimitive[pairRays[winner]] = self.primitiveArray[pairSlots[winner]]
+        bestDist[closer] = closest[closer]
+        bestRank[closer] = closestRank[closer]
+
+    @staticmethod
+    def boxEntry(node, ox, oy, oz, ix, iy, iz, maxDist): # slab test returning the entry distance of a ray into a node's box, or None on a miss
+        minX, minY, minZ, maxX, maxY, maxZ = node[:6]
+        t1, t2 = (minX - ox) * ix, (maxX - ox) * ix
+        near, far = (t1, t2) if t1 < t2 else (t2, t1)
+        t1, t2 = (minY - oy) * iy, (maxY - oy) * iy
+        if t1 > t2:
+            t1, t2 = t2, t1
+        near, far = max(near, t1), min(far, t2)
+        t1, t2 = (minZ - oz) * iz, (maxZ - oz) * iz
+        if t1 > t2:
+            t1, t2 = t2, t1
+        near, far = max(near, t1, 0.0), min(far, t2, maxDist)
+        if near > far:
+            return None
+        return near
@@ -0,0 +1,128 @@
+# import necessary libraries
+import sys
+import numpy as np
+from utilities import *
+from rayKernels import sphereDistances, triangleDistances, normalise, cross
+
+epsilon = sys.float_info.epsilon # small value to handle floating point precision errors
+
+class CompiledScene: # scene packed into contiguous arrays (structure of arrays) for fast intersection tests
+    # primitives are numbered with triangles first, followed by spheres
+    def __init__(self, triangleVertices, triangleColours, triangleShine, triangleEmission, triangleOrder,
+                 sphereCentres, sphereRadii, sphereColours, sphereShine, sphereEmission, sphereOrder, dtype=np.float64):
+        self.dtype = dtype # float32 halves memory per primitive at the cost of precision
+        vertices = np.asarray(triangleVertices, dtype=np.float64).reshape(-1, 3, 3)
+        # triangles store their first vertex with the two edges leaving it, so the edges are not recomputed for every ray
+        self.trianglePoint = np.ascontiguousarray(vertices[:, 0], dtype=dtype)
+        self.triangleEdge1 = np.ascontiguousarray(vertices[:, 1] - vertices[:, 0], dtype=dtype)
+        self.triangleEdge2 = np.ascontiguousarray(vertices[:, 2] - vertices[:, 0], dtype=dtype)
+        self.triangleNormal = np.ascontiguousarray(normalise(cross(vertices[:, 1] - vertices[:, 0], vertices[:, 2] - vertices[:, 0])), dtype=dtype)
+        self.triangleColour = np.asarray(triangleColours, dtype=dtype).reshape(-1, 3)
+        self.triangleShine = np.asarray(triangleShine, dtype=dtype)
+        self.triangleEmission = np.asarray(triangleEmission, dtype=dtype)
+        # spheres store their radius squared alongside the radius, squared the same way as Ray.hitSphere
+        self.sphereCentre = np.asarray(sphereCentres, dtype=dtype).reshape(-1, 3)
+        self.sphereRadius = np.asarray(sphereRadii, dtype=dtype)
+        self.sphereRadiusSq = np.array([radius ** 2 for radius in sphereRadii], dtype=dtype)
+        self.sphereColour = np.asarray(sphereColours, dtype=dtype).reshape(-1, 3)
+        self.sphereShine = np.asarray(sphereShine, dtype=dtype)
+        self.sphereEmission = np.asarray(sphereEmission, dtype=dtype)
+        # position of each primitive in the original object list, used to break ties like a linear scan
+        self.order = np.concatenate((np.asarray(triangleOrder, dtype=np.int64), np.asarray(sphereOrder, dtype=np.int64)))
+        self.triangleCount = len(self.trianglePoint)
+
+    def __len__(self): # returns the total number of primitives
+        return len(self.order)
+
+    def bounds(self): # returns the minimum and maximum corners of the bounding box of every primitive
+        p1 = self.trianglePoint.astype(np.float64)
+        p2 = p1 + self.triangleEdge1
+        p3 = p1 + self.triangleEdge2
+        radius = self.sphereRadius.astype(np.float64)[:, None]
+        boxMin = np.concatenate((np.minimum(np.minimum(p1, p2), p3), self.sphereCentre - radius))
+        boxMax = np.concatenate((np.maximum(np.maximum(p1, p2), p3), self.sphereCentre + radius))
+        return (boxMin, boxMax)
+
+    def distances(self, primitives, origins, directions): # distance along each ray to the paired primitive (inf for a miss)
+        dist = np.full(len(primitives), np.inf)
+        triangles = primitives < self.triangleCount
+        spheres = ~triangles
+        if triangles.any():
+            t = primitives[triangles]
+            dist[triangles] = triangleDistances(origins[triangles], directions[triangles], self.trianglePoint[t],
+                                                self.triangleEdge1[t], self.triangleEdge2[t])
+        if spheres.any():
+            s = primitives[spheres] - self.triangleCount
+            dist[spheres] = sphereDistances(origins[spheres], directions[spheres], self.sphereCentre[s], self.sphereRadiusSq[s])
+        return dist
+
+    def surfaces(self, primitives, hitPoints): # returns the normal, colour, shine and emission at hit points on the given primitives
+        normals = np.zeros((len(primitives), 3))
+        colours = np.zeros((len(primitives), 3))
+        shine = np.zeros(len(primitives))
+        emission = np.zeros(len(primitives))
+        triangles = primitives < self.triangleCount
+        spheres = ~triangles
+        t = primitives[triangles]
+        normals[triangles] = self.triangleNormal[t]
+        colours[triangles] = self.triangleColour[t]
+        shine[triangles] = self.triangleShine[t]
+        emission[triangles] = self.triangleEmission[t]
+        s = primitives[spheres] - self.triangleCount
+        normals[spheres] = normalise(hitPoints[spheres] - self.sphereCentre[s])
+        colours[spheres] = self.sphereColour[s]
+        shine[spheres] = self.sphereShine[s]
+        emission[spheres] = self.sphereEmission[s]
+        return (normals, colours, shine, emission)
+
+    def distance(self, primitive, origin, direction): # distance along a single ray to a primitive, or None for a miss
+        if primitive < self.triangleCount:
+            return self.triangleDistance(primitive, origin, direction)
+        return self.sphereDistance(primitive - self.triangleCount, origin, direction)
+
+    def sphereDistance(self, index, origin, direction): # scalar version of Ray.hitSphere using the packed sphere data
+        cx, cy, cz = self.sphereCentre[index].tolist()
+        rx, ry, rz = origin.x - cx, origin.y - cy, origin.z - cz
+        # coefficients for the quadratic equation
+        a = direction.dot(direction)
+        b = 2 * ((direction.x * rx) + (direction.y * ry) + (direction.z * rz))
+        c = ((rx * rx) + (ry * ry) + (rz * rz)) - float(self.sphereRadiusSq[index])
+        intersects = solveQuadratic(a, b, c)
+        # if there is no valid intersection or if intersection lies behind ray origin
+        if intersects == False or (intersects[0] < 0 and intersects[1] < 0):
+            return None
+        # choose the closest positive intersection
+        return min(intersects) if intersects[0] > 0 and intersects[1] > 0 else max(intersects)
+
+    def triangleDistance(self, index, origin, direction): # scalar version of Ray.hitTriangle using the precomputed edges
+        px, py, pz = self.trianglePoint[index].tolist()
+        ax, ay, az = self.triangleEdge1[index].tolist()
+        bx, by, bz = self.triangleEdge2[index].tolist()
+        dx, dy, dz = direction.x, direction.y, direction.z
+        # calculate determinant to check if the ray and triangle are parallel
+        qx, qy, qz = dy * bz - dz * by, dz * bx - dx * bz, dx * by - dy * bx
+        det = (ax * qx) + (ay * qy) + (az * qz)
+        if det > -epsilon and det < epsilon:
+            return None
+        invDet = 1 / det
+        # first barycentric coordinate
+        sx, sy, sz = origin.x - px, origin.y - py, origin.z - pz
+        u = invDet * ((sx * qx) + (sy * qy) + (sz * qz))
+        if ((u < 0 and abs(u) > epsilon) or (u > 1 and abs(u-1) > epsilon)):
+            return None
+        # second barycentric coordinate
+        rx, ry, rz = sy * az - sz * ay, sz * ax - sx * az, sx * ay - sy * ax
+        v = invDet * ((dx * rx) + (dy * ry) + (dz * rz))
+        if ((v < 0 and abs(v) > epsilon) or (u + v > 1 and abs(u + v - 1) > epsilon)):
+            return None
+        # the intersection must be in front of the ray origin
+        dist = invDet * ((bx * rx) + (by * ry) + (bz * rz))
+        return dist if dist > epsilon else None
+
+    def surface(self, primitive, hitPoint): # returns the normal, colour, shine and emission at a hit point on a single primitive
+        if primitive < self.triangleCount:
+            return (Vect(*self.triangleNormal[primitive].tolist()), Vect(*self.triangleColour[primitive].tolist()),
+                    float(self.triangleShine[primitive]), float(self.triangleEmission[primitive]))
+        index = primitive - self.triangleCount
+        return ((hitPoint - Vect(*self.sphereCentre[index].tolist())).normalise(), Vect(*self.sphereColour[index].tolist()),
+                float(self.sphereShine[index]), float(self.sphereEmission[index]))
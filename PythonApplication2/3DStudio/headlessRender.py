@@ -0,0 +1,97 @@
+# renders a saved scene or .obj file to a PNG without opening a window
+# example: python headlessRender.py model.obj --scale 10 --width 640 --height 360 --samples 64 --output model.png
+# import necessary modules
+import os
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "" # hide pygame support prompt
+import argparse
+import time
+import pygame
+# import custom renderers
+from realtimeRenderer import RealtimeRenderer
+from staticRenderer import StaticRenderer
+import sceneFile
+from profiler import profiler
+# import custom utility functions and structures
+from utilities import *
+
+def loadScene(path, scale, colour, shine, emission): # returns the list of realtime shapes stored in a saved scene or object file
+    if path.endswith(".obj"):
+        # the realtime renderer only needs a surface to size itself against, so an off-screen one is used
+        rt = RealtimeRenderer(pygame.Surface((810, 540)), 300, Vect(0, 0, 1000), 2000, (1, 1, 1.7), 0.8, (85, 0, 0), False)
+        return unnest(rt.load(path, scale, colour, ["Triangle", shine, emission]))
+    # load scene data from binary file, converting scenes saved by earlier versions
+    return sceneFile.loadScene(path)
+
+def parseArguments(argv=None): # reads the command line options
+    parser = argparse.ArgumentParser(description="Render a 3D Studio scene to a PNG without a display.")
+    parser.add_argument("scene", help="saved scene (.txt) or object file (.obj) to render")
+    parser.add_argument("--output", default="image.png", help="path of the PNG to write")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=360)
+    parser.add_argument("--samples", type=int, default=None, help="stop after this many samples per pixel")
+    parser.add_argument("--time", type=float, default=None, help="stop after this many seconds")
+    parser.add_argument("--bounces", type=int, default=5, help="maximum bounces per ray")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (defaults to every core)")
+    parser.add_argument("--seed", type=int, default=0, help="seed that all random sampling is derived from")
+    parser.add_argument("--integrator", choices=["path", "wavefront"], default="path")
+    parser.add_argument("--sampler", choices=["random", "halton"], default="random", help="halton converges in fewer samples")
+    parser.add_argument("--tile-size", type=int, default=16)
+    parser.add_argument("--samples-per-task", type=int, default=1)
+    parser.add_argument("--trace", default=None, help="path of a Chrome trace of each pass to write")
+    # object file options, matching the fields of the load file screen
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--colour", default="FFFFFF", help="object colour as a hex code")
+    parser.add_argument("--shine", type=float, default=0.0)
+    parser.add_argument("--emission", type=float, default=0.0)
+    # environment options, defaulting to the editor's sky
+    parser.add_argument("--sky-light", type=float, default=0.8)
+    parser.add_argument("--sky-colour", default=None, help="sky tint as a hex code")
+    arguments = parser.parse_args(argv)
+
+    # validate inputs
+    if arguments.samples is None and arguments.time is None:
+        arguments.samples = 16 # render a fixed number of samples if no budget is given
+    if arguments.samples is not None and arguments.samples < 1:
+        parser.error("--samples must be at least 1")
+    if arguments.time is not None and arguments.time <= 0:
+        parser.error("--time must be greater than 0")
+    for name in ["width", "height", "bounces", "tile_size", "samples_per_task"]:
+        if getattr(arguments, name) < 1:
+            parser.error(f"--{name.replace('_', '-')} must be at least 1")
+    if arguments.workers is not None and arguments.workers < 1:
+        parser.error("--workers must be at least 1")
+    if not 0 <= arguments.seed < 2 ** 64:
+        parser.error("--seed must be between 0 and 2^64 - 1")
+    if not isValidHexCode(arguments.colour) or (arguments.sky_colour is not None and not isValidHexCode(arguments.sky_colour)):
+        parser.error("colours must be 6 digit hex codes, for example FFFFFF")
+    if not arguments.scene.endswith((".obj", ".txt")) or not os.path.isfile(arguments.scene):
+        parser.error("scene must be an existing .obj or .txt file")
+    return arguments
+
+def main(argv=None):
+    arguments = parseArguments(argv)
+    polygons = loadScene(arguments.scene, arguments.scale, normaliseRGB(hexToRGB(arguments.colour)), arguments.shine, arguments.emission)
+    # use the same sky tint conversion as the editor's Edit Sky option
+    skyTint = (1, 1, 1.7) if arguments.sky_colour is None else normaliseRGB(tuple(1.7 * x for x in hexToRGB(arguments.sky_colour)))
+
+    sr = StaticRenderer(arguments.width, arguments.height, (0, 0, 0), None, polygons, skyTint, arguments.sky_light,
+                        tileSize=arguments.tile_size, samplesPerTask=arguments.samples_per_task, integrator=arguments.integrator,
+                        maxBounces=arguments.bounces, workers=arguments.workers, seed=arguments.seed,
+                        sampler=arguments.sampler)
+    if arguments.trace is not None:
+        profiler.enable()
+    startTime = time.perf_counter()
+    sr.render(targetSamples=arguments.samples, timeBudget=arguments.time, output=arguments.output)
+    print(f"Rendered {sr.frames} samples per pixel in {timer(startTime):.2f}s to {arguments.output}")
+    if arguments.trace is not None:
+        profiler.disable()
+        profiler.exportTrace(arguments.trace)
+        # the first frame holds the work done once before any pass, such as compiling the scene and starting the workers
+        frames = list(profiler.frames)
+        for path, seconds in sorted(frames[0].items()):
+            print(f"{path:<32}{seconds * 1000:10.2f} ms once")
+        for path, seconds in profiler.averages(frames[1:]).items():
+            print(f"{path:<32}{seconds * 1000:10.2f} ms per pass")
+
+if __name__ == "__main__":
+    main()
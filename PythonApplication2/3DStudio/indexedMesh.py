@@ -0,0 +1,208 @@
+# import necessary libraries
+import numpy as np
+from rayKernels import dot, cross, normalise
+
+boundaryWeight = 100 # weight of the planes that hold open mesh borders in place during simplification
+
+# class for a triangle mesh stored as a shared vertex array and a face index array
+# each face also carries the colour and emission flag of the triangle it came from
+class IndexedMesh:
+    def __init__(self, vertices, faces, colours, emissive):
+        self.vertices = vertices # (V, 3) array of vertex positions
+        self.faces = faces # (F, 3) array of indices into vertices
+        self.colours = colours # (F, 3) array of face colours
+        self.emissive = emissive # (F,) array, true for faces that keep their original colour
+
+    def __len__(self): # returns the number of faces
+        return len(self.faces)
+
+    def subdivide(self): # splits every face into 4 using the midpoints of its edges, returning the new mesh
+        vertexCount = len(self.vertices)
+        # every edge of every face, in the order p1-p2, p2-p3, p1-p3
+        edges = self.faces[:, [0, 1, 1, 2, 0, 2]].reshape(-1, 2)
+        # edges shared by neighbouring faces have the same key, so each midpoint is only created once
+        low, high = edges.min(axis=1), edges.max(axis=1)
+        keys, first, edgeIndex = np.unique(low * vertexCount + high, return_index=True, return_inverse=True)
+        midpoints = (self.vertices[edges[first, 0]] + self.vertices[edges[first, 1]]) / 2
+        middle = edgeIndex.reshape(-1, 3) + vertexCount # indices of the midpoints of p1-p2, p2-p3 and p1-p3
+        p1, p2, p3 = self.faces[:, 0], self.faces[:, 1], self.faces[:, 2]
+        m12, m23, m13 = middle[:, 0], middle[:, 1], middle[:, 2]
+        # each face is replaced by its 3 corner triangles followed by the middle triangle
+        faces = np.stack((np.stack((p1, m12, m13), axis=1),
+                          np.stack((m12, p2, m23), axis=1),
+                          np.stack((m13, m23, p3), axis=1),
+                          np.stack((m12, m23, m13), axis=1)), axis=1).reshape(-1, 3)
+        return IndexedMesh(np.concatenate((self.vertices, midpoints)), faces,
+                           np.repeat(self.colours, 4, axis=0), np.repeat(self.emissive, 4))
+
+    def compact(self): # returns the mesh with unused vertices removed
+        used, faces = np.unique(self.faces, return_inverse=True)
+        return IndexedMesh(self.vertices[used], faces.reshape(-1, 3), self.colours, self.emissive)
+
+    def simplify(self, targetFaces): # returns a simplified mesh with close to targetFaces faces
+        mesh, _ = collapseEdges(self, vertexQuadrics(self), targetFaces)
+        return mesh.compact()
+
+    def components(self): # splits the faces into connected pieces, returning the piece of each face and the number of pieces
+        # every vertex starts in its own piece and repeatedly takes the lowest piece of any vertex it shares an edge with
+        labels = np.arange(len(self.vertices))
+        a = self.faces.ravel()
+        b = self.faces[:, [1, 2, 0]].ravel()
+        while True:
+            lowest = np.minimum(labels[a], labels[b])
+            merged = labels.copy()
+            np.minimum.at(merged, a, lowest)
+            np.minimum.at(merged, b, lowest)
+            merged = merged[merged] # follow chains of labels so long pieces converge quickly
+            if np.array_equal(merged, labels):
+                break
+            labels = merged
+        _, pieces = np.unique(labels[self.faces[:, 0]], return_inverse=True)
+        return (pieces.reshape(-1), int(pieces.max()) + 1 if len(pieces) else 0)
+
+    def closedPieces(self, pieces, pieceCount): # returns which pieces are closed and consistently wound, and whether their faces wind outwards
+        # in a closed, consistently wound surface every directed edge appears once and so does its reverse
+        vertexCount = len(self.vertices)
+        a = self.faces.ravel()
+        b = self.faces[:, [1, 2, 0]].ravel()
+        forward = a * vertexCount + b
+        reverse = b * vertexCount + a
+        keys, counts = np.unique(forward, return_counts=True)
+        found = np.minimum(np.searchsorted(keys, reverse), len(keys) - 1)
+        paired = (keys[found] == reverse) & (counts[found] == 1) & (counts[np.searchsorted(keys, forward)] == 1)
+        closed = np.ones(pieceCount, dtype=bool)
+        closed[np.repeat(pieces, 3)[~paired]] = False
+        # the signed volume enclosed by a piece is positive when its faces wind outwards
+        corners = self.vertices[self.faces]
+        volume = np.bincount(pieces, weights=dot(corners[:, 0], cross(corners[:, 1], corners[:, 2])), minlength=pieceCount)
+        return (closed, volume >= 0)
+
+def uniqueEdges(faces, vertexCount): # returns every edge once as a pair of vertex indices, with the number of faces using it and one of those faces
+    edges = faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+    keys = edges.min(axis=1) * vertexCount + edges.max(axis=1)
+    _, first, counts = np.unique(keys, return_index=True, return_counts=True)
+    return (edges[first], counts, first // 3)
+
+def vertexQuadrics(mesh): # sums the error quadric of the planes around every vertex, as (V, 4, 4) matrices
+    corners = mesh.vertices[mesh.faces]
+    normals = cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    area = np.sqrt(dot(normals, normals)) / 2
+    normals = normalise(normals)
+    # each face contributes the squared distance to its plane, weighted by its area
+    planes = np.concatenate((normals, -dot(normals, corners[:, 0])[:, None]), axis=1)
+    faceQuadrics = planes[:, :, None] * planes[:, None, :] * area[:, None, None]
+    quadrics = np.zeros((len(mesh.vertices), 4, 4))
+    for corner in range(3):
+        np.add.at(quadrics, mesh.faces[:, corner], faceQuadrics)
+
+    # open borders get a plane perpendicular to their face, so they are not pulled inwards
+    edges, counts, edgeFaces = uniqueEdges(mesh.faces, len(mesh.vertices))
+    border = counts == 1
+    start = mesh.vertices[edges[border, 0]]
+    direction = mesh.vertices[edges[border, 1]] - start
+    sideNormals = normalise(cross(direction, normals[edgeFaces[border]]))
+    planes = np.concatenate((sideNormals, -dot(sideNormals, start)[:, None]), axis=1)
+    borderQuadrics = planes[:, :, None] * planes[:, None, :] * (dot(direction, direction) * boundaryWeight)[:, None, None]
+    for end in range(2):
+        np.add.at(quadrics, edges[border, end], borderQuadrics)
+    return quadrics
+
+def quadricError(quadrics, points): # returns the error of placing each point against its quadric
+    homogeneous = np.concatenate((points, np.ones((len(points), 1))), axis=1)
+    return np.einsum("ni,nij,nj->n", homogeneous, quadrics, homogeneous)
+
+def collapseEdges(mesh, quadrics, targetFaces): # repeatedly collapses the cheapest edges of a mesh until it has close to targetFaces faces
+    # each pass collapses a set of edges that share no vertices, so they can all be applied at once
+    vertices, faces, colours, emissive = mesh.vertices.copy(), mesh.faces, mesh.colours, mesh.emissive
+    quadrics = quadrics.copy()
+    vertexCount = len(vertices)
+    blocked = np.zeros(0, dtype=np.int64) # keys of edges whose collapse would flip a face
+    while len(faces) > targetFaces:
+        edges, _, _ = uniqueEdges(faces, vertexCount)
+        a, b = edges[:, 0], edges[:, 1]
+        keys = np.minimum(a, b) * vertexCount + np.maximum(a, b)
+        edgeQuadrics = quadrics[a] + quadrics[b]
+        # the best position on each edge is the quadric minimum where it exists, otherwise the best of the end points and the midpoint
+        candidates = np.stack((vertices[a], vertices[b], (vertices[a] + vertices[b]) / 2, (vertices[a] + vertices[b]) / 2), axis=1)
+        # nearly flat regions give nearly singular systems, so the determinant is compared with the size of the system, whatever the mesh scale
+        system = edgeQuadrics[:, :3, :3]
+        solvable = np.abs(np.linalg.det(system)) > 1e-6 * ((system ** 2).sum(axis=(1, 2)) ** 1.5)
+        if solvable.any():
+            solved = np.linalg.solve(system[solvable], -edgeQuadrics[solvable, :3, 3:])[:, :, 0]
+            # the minimum is clamped to the box spanned by the edge, so simplified meshes never grow past the source mesh
+            ends = vertices[a[solvable]], vertices[b[solvable]]
+            candidates[solvable, 3] = np.clip(solved, np.minimum(*ends), np.maximum(*ends))
+        errors = np.stack([quadricError(edgeQuadrics, candidates[:, i]) for i in range(4)], axis=1)
+        best = np.argmin(errors, axis=1)
+        cost = errors[np.arange(len(edges)), best]
+        position = candidates[np.arange(len(edges)), best]
+
+        # only the cheaper half of the unblocked edges are considered, and each chosen edge must be the cheapest edge at both of its vertices
+        unblocked = np.flatnonzero(~np.isin(keys, blocked))
+        order = unblocked[np.argsort(cost[unblocked], kind="stable")][:max(1, len(unblocked) // 2)]
+        rank = np.full(len(edges), len(edges))
+        rank[order] = np.arange(len(order))
+        cheapest = np.full(vertexCount, len(edges))
+        np.minimum.at(cheapest, a, rank)
+        np.minimum.at(cheapest, b, rank)
+        chosen = order[(cheapest[a[order]] == rank[order]) & (cheapest[b[order]] == rank[order])]
+        # each collapse removes about 2 faces, so stop at the target
+        chosen = chosen[:max(1, (len(faces) - targetFaces + 1) // 2)]
+
+        # drop and block collapses that would flip a face, checking again until none do
+        while len(chosen):
+            remap = np.arange(vertexCount)
+            remap[b[chosen]] = a[chosen]
+            moved = vertices.copy()
+            moved[a[chosen]] = position[chosen]
+            newFaces = remap[faces]
+            kept = (newFaces[:, 0] != newFaces[:, 1]) & (newFaces[:, 1] != newFaces[:, 2]) & (newFaces[:, 0] != newFaces[:, 2])
+            before = vertices[faces]
+            after = moved[newFaces]
+            oldNormals = cross(before[:, 1] - before[:, 0], before[:, 2] - before[:, 0])
+            newNormals = cross(after[:, 1] - after[:, 0], after[:, 2] - after[:, 0])
+            flipped = kept & (dot(oldNormals, newNormals) <= 0) & (dot(oldNormals, oldNormals) > 0)
+            if not flipped.any():
+                break
+            touched = np.zeros(vertexCount, dtype=bool)
+            touched[faces[flipped].ravel()] = True
+            rejected = touched[a[chosen]] | touched[b[chosen]]
+            blocked = np.concatenate((blocked, keys[chosen[rejected]]))
+            chosen = chosen[~rejected]
+        if len(chosen) == 0:
+            # every remaining edge is blocked, so the mesh cannot be simplified any further
+            if len(unblocked) == 0:
+                break
+            continue
+
+        # apply the collapses, merging the quadrics of the joined vertices
+        quadrics[a[chosen]] += quadrics[b[chosen]]
+        vertices = moved
+        faces, colours, emissive = newFaces[kept], colours[kept], emissive[kept]
+    return (IndexedMesh(vertices, faces, colours, emissive), quadrics)
+
+def lodChain(mesh, minFaces=16, ratio=4): # returns a list of meshes from full detail down, each with about 1/ratio of the faces of the last
+    chain = [mesh]
+    quadrics = vertexQuadrics(mesh)
+    while len(mesh) > minFaces:
+        simplified, quadrics = collapseEdges(mesh, quadrics, len(mesh) // ratio)
+        # stop once the mesh can no longer be simplified much further
+        if len(simplified) > len(mesh) * 0.9:
+            break
+        mesh = simplified
+        chain.append(simplified.compact())
+    return chain
+
+def combineMeshes(meshes): # joins meshes into one, offsetting the faces of each by the vertices before it
+    offsets = np.cumsum([0] + [len(mesh.vertices) for mesh in meshes[:-1]])
+    return IndexedMesh(np.concatenate([mesh.vertices for mesh in meshes]).reshape(-1, 3),
+                       np.concatenate([mesh.faces + offset for mesh, offset in zip(meshes, offsets)]).reshape(-1, 3),
+                       np.concatenate([mesh.colours for mesh in meshes]).reshape(-1, 3),
+                       np.concatenate([mesh.emissive for mesh in meshes]))
+
+def meshFromTriangles(triangles): # builds an indexed mesh from triangle objects, merging corners at the same position
+    corners = np.array([(p.x, p.y, p.z) for t in triangles for p in (t.p1, t.p2, t.p3)], dtype=np.float64).reshape(-1, 3)
+    vertices, faces = np.unique(corners, axis=0, return_inverse=True)
+    colours = np.array([t.colour for t in triangles], dtype=np.float64).reshape(-1, 3)
+    emissive = np.array([t.rtArgs[2] != 0 for t in triangles], dtype=bool)
+    return IndexedMesh(vertices, faces.reshape(-1, 3).astype(np.int64), colours, emissive)
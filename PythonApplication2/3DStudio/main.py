@@ -5,11 +5,13 @@ os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "" # hide pygame support prompt
 import pygame
 from sys import exit
 import pygame_gui as gui
-import pickle
 from PIL import Image
 # import custom renderers
-from realtimeRenderer import RealtimeRenderer
+from realtimeRenderer import RealtimeRenderer, ShapeGroup
 from staticRenderer import StaticRenderer
+from sceneFile import loadScene, saveScene
+from sceneHistory import Scene, AddShapes, History
+from profiler import profiler
 # import custom utility functions and structures
 from utilities import *
 
@@ -113,10 +115,9 @@ if __name__ == "__main__":
                             objRtArgs = ["Triangle", float(uiInputData[shineInput]), float(uiInputData[emissionInput])]
                             state = "editor"
                     elif uiInputData[fileInput].endswith(".txt") and isInDirectory(uiInputData[fileInput]):
-                        # load scene data from binary file
+                        # load scene data from binary file, converting scenes saved by earlier versions
                         try: 
-                            save = open(uiInputData[fileInput], "rb")
-                            polygons = pickle.load(save)
+                            polygons = loadScene(uiInputData[fileInput])
                             shapes = (0, 0)
                             state = "editor"
                         except:
@@ -227,19 +228,24 @@ if __name__ == "__main__":
     
     rt.update()
 
-    # if object has been loaded, update polygons array
-    if loadedObj != 0 or polygons == []:
-        polygons = unnest(rt.setup(loadedObj))
+    # initialise the scene and its undo history
+    scene = Scene()
+    history = History(scene)
+
+    # if object has been loaded, import it as a single command so it can be undone in one step
+    # imported meshes and loaded scenes are simplified once here, while shapes added by hand are always drawn at full detail
+    if loadedObj != 0:
+        history.execute(AddShapes(ShapeGroup(rt.setup(loadedObj))))
+    elif polygons == []:
+        scene.add(ShapeGroup(rt.setup(loadedObj)))
+    else:
+        scene.add(ShapeGroup(polygons))
 
     addingSphere = False
     addingTriangle = False
     editingSky = False
     savingAs = False
 
-    # initialise stacks for undo/redo functionality
-    undoStack = Stack()
-    redoStack = Stack()
-
     # editor loop
     while state == "editor":
         clock.tick()
@@ -247,14 +253,18 @@ if __name__ == "__main__":
         window.fill("black")
 
         # update renderer attributes and render scene
+        profiler.frame()
         rt.update()
-        rt.render(polygons)
+        with profiler.span("render"):
+            rt.render(scene.groups())
         
         # draw menu
-        pygame.draw.rect(window, (6, 6, 15), pygame.Rect(0, 0, 170, winHeight))
-        guiManager.update(time_delta)
-        guiManager.draw_ui(window)
-        pygame.display.flip()
+        with profiler.span("interface"):
+            pygame.draw.rect(window, (6, 6, 15), pygame.Rect(0, 0, 170, winHeight))
+            guiManager.update(time_delta)
+            guiManager.draw_ui(window)
+        with profiler.span("flip"):
+            pygame.display.flip()
 
         for event in pygame.event.get():
             if event.type == pygame.MOUSEWHEEL:
@@ -268,6 +278,18 @@ if __name__ == "__main__":
                         rt.rotationLock = False
                     else:
                         rt.rotationLock = True
+                if event.button == 2: # middle click switches between the painter's algorithm and the depth buffer
+                    if rt.backend == "zbuffer":
+                        rt.backend = "painter"
+                    else:
+                        rt.backend = "zbuffer"
+
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3: # F3 starts tracing frames, and pressing it again saves the trace
+                if profiler.enabled:
+                    profiler.disable()
+                    profiler.exportTrace("trace.json")
+                else:
+                    profiler.enable()
 
             if event.type == gui.UI_BUTTON_PRESSED:
                 if event.ui_element == renderButton:
@@ -317,10 +339,8 @@ if __name__ == "__main__":
                             sphere = rt.getSphere(Vect(float(p[0]), 0 - float(p[1]), float(p[2])), float(uiInputData[radiusInput]),
                                                   normaliseRGB(hexToRGB(uiInputData[colourInput])),
                                                   float(uiInputData[shineInput]), float(uiInputData[emissionInput]))
-                            # add sphere object to shape array
-                            polygons.append(sphere)
-                            # push action to the undo stack
-                            undoStack.push(sphere)
+                            # add sphere object to the scene as an undoable command
+                            history.execute(AddShapes(ShapeGroup([sphere], simplify=False)))
                             addingSphere = False
 
                     elif addingTriangle:
@@ -337,10 +357,8 @@ if __name__ == "__main__":
                                                       Vect(float(p3[0]), 0 - float(p3[1]), float(p3[2])),
                                                       normaliseRGB(hexToRGB(uiInputData[colourInput])),
                                                       float(uiInputData[shineInput]), float(uiInputData[emissionInput]))
-                            # add triangle to shape array
-                            polygons.append(triangle)
-                            # push action to the undo stack
-                            undoStack.push(triangle)
+                            # add triangle to the scene as an undoable command
+                            history.execute(AddShapes(ShapeGroup([triangle], simplify=False)))
                             addingTriangle = False
 
                 elif event.ui_element == editSkyButton:
@@ -381,28 +399,19 @@ if __name__ == "__main__":
                     if uiInputData[saveFileInput].endswith(".txt"):
                         try:
                             # write scene data to the given binary file
-                            save = open(uiInputData[saveFileInput], "wb")
-                            pickle.dump(polygons, save)
+                            saveScene(uiInputData[saveFileInput], scene.shapes())
                         except:
                             pass
                         uiHide((saveFileInput, saveButton))
                         savingAs = False
 
                 elif event.ui_element == undoButton:
-                    # pop last action from the undo stack, carry out action, push to redo stack
-                    if undoStack.hasData():
-                        action = undoStack.pop()
-                        if action is not None:
-                            polygons.remove(action)
-                        redoStack.push(action)
+                    # undo the last command, which can then be redone
+                    history.undo()
 
                 elif event.ui_element == redoButton:
-                    # pop last action from the redo stack, carry out action, push to undo stack
-                    if redoStack.hasData():
-                        action = redoStack.pop()
-                        if action is not None:
-                            polygons.append(action)
-                        undoStack.push(action)
+                    # redo the last undone command
+                    history.redo()
 
                 elif event.ui_element == quitButton:
                     # exit the program
@@ -428,7 +437,7 @@ if __name__ == "__main__":
     window = pygame.display.set_mode(windowSize)
 
     # initialise static renderer and render the final image
-    sr = StaticRenderer(int(width), int(height), (0,0,0), window, polygons, rt.skyTint, rt.skyLight)
+    sr = StaticRenderer(int(width), int(height), (0,0,0), window, scene.shapes(), rt.skyTint, rt.skyLight)
     sr.render()
 
     # open rendered image
@@ -0,0 +1,66 @@
+# import necessary libraries
+import hashlib
+import os
+import struct
+import numpy as np
+from objParser import parseObj
+
+# binary cache of parsed .obj meshes, stored next to the source file as <name>.obj.meshcache
+# layout: a 64 byte header followed by the vertex array (float64, N x 3) and the face array (uint32, M x 3)
+# header: magic, format version, padding, sha256 of the source file, vertex count, face count
+cacheMagic = b"3DSMESH\0"
+cacheVersion = 1
+headerFormat = "<8sII32sQQ"
+headerSize = struct.calcsize(headerFormat)
+vertexType = np.dtype("<f8")
+faceType = np.dtype("<u4")
+
+def fileHash(path): # returns the sha256 digest of a file's contents
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+def cachePath(path): # returns the path of the cache file for a mesh
+    return path + ".meshcache"
+
+def readCache(path, digest): # memory maps the vertex and face arrays from a cache file, or returns None if it is missing or stale
+    try:
+        with open(path, "rb") as file:
+            header = file.read(headerSize)
+        if len(header) != headerSize:
+            return None
+        magic, version, _, cachedDigest, vertexCount, faceCount = struct.unpack(headerFormat, header)
+        # the cache is only valid if it was written by this version from identical file contents
+        if magic != cacheMagic or version != cacheVersion or cachedDigest != digest:
+            return None
+        if os.path.getsize(path) != headerSize + vertexCount * 3 * vertexType.itemsize + faceCount * 3 * faceType.itemsize:
+            return None
+        vertices = np.memmap(path, dtype=vertexType, mode="r", offset=headerSize, shape=(vertexCount, 3)) if vertexCount else np.zeros((0, 3))
+        faceOffset = headerSize + vertexCount * 3 * vertexType.itemsize
+        faces = np.memmap(path, dtype=faceType, mode="r", offset=faceOffset, shape=(faceCount, 3)) if faceCount else np.zeros((0, 3), dtype=faceType)
+        return (vertices, faces)
+    except (OSError, ValueError, struct.error):
+        return None
+
+def writeCache(path, digest, vertices, faces): # writes the vertex and face arrays to a cache file
+    try:
+        # write to a temporary file first so a partially written cache is never read
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as file:
+            file.write(struct.pack(headerFormat, cacheMagic, cacheVersion, 0, digest, len(vertices), len(faces)))
+            file.write(np.ascontiguousarray(vertices, dtype=vertexType).tobytes())
+            file.write(np.ascontiguousarray(faces, dtype=faceType).tobytes())
+        os.replace(temporary, path)
+    except OSError:
+        pass # caching is only an optimisation, so an unwritable directory is not an error
+
+def loadMesh(path): # returns the vertex and face arrays of an object file, using the cache when the file has not changed
+    digest = fileHash(path)
+    cached = readCache(cachePath(path), digest)
+    if cached is not None:
+        return cached
+    vertices, faces = parseObj(path)
+    writeCache(cachePath(path), digest, vertices, faces)
+    return (vertices, faces)
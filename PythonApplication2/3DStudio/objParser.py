@@ -0,0 +1,147 @@
+# import necessary libraries
+import os
+import numpy as np
+from multiprocessing import Pool
+
+# streaming reader for .obj files that parses vertex and face lines straight into arrays
+# the file is split into chunks that end on line boundaries, so only one chunk per process is held in memory at a time
+# only geometry is read: texture coordinates, normals, materials and groups are skipped
+
+chunkSize = 1 << 23 # bytes parsed at once by each process
+parallelSize = 1 << 26 # files larger than this are parsed across a process pool
+
+def chunkRanges(path, size=chunkSize): # returns (start, end) byte ranges covering a file, each ending after a newline
+    ranges = []
+    fileSize = os.path.getsize(path)
+    with open(path, "rb") as file:
+        start = 0
+        while start < fileSize:
+            # move each boundary forward to just after the next newline so no line is split between chunks
+            file.seek(min(start + size, fileSize))
+            file.readline()
+            end = min(file.tell(), fileSize)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def parseNumbers(data, lineCount, dtype): # parses lines of whitespace separated numbers, returning the numbers and how many are on each line
+    numbers = np.fromstring(data.tobytes(), dtype=dtype, sep=" ")
+    # count the tokens on each line by finding the first character of every token
+    newline = data == 10
+    space = (data == 32) | (data == 9) | (data == 13) | newline
+    tokenStart = ~space
+    tokenStart[1:] &= space[:-1]
+    starts = np.concatenate(([0], np.flatnonzero(newline[:-1]) + 1))
+    counts = np.add.reduceat(tokenStart.view(np.uint8), starts, dtype=np.int64) if len(data) else np.zeros(0, dtype=np.int64)
+    if len(numbers) != counts.sum() or len(counts) != lineCount:
+        raise ValueError("malformed vertex or face line in object file")
+    return (numbers, counts)
+
+def dropSlashFields(data): # removes the texture and normal indices of v/vt/vn, v//vn and v/vt face elements, keeping the vertex index
+    position = np.arange(len(data), dtype=np.int32)
+    space = (data == 32) | (data == 9) | (data == 13) | (data == 10)
+    # a byte is dropped if a slash appears after the last whitespace before it
+    lastSpace = np.maximum.accumulate(np.where(space, position, -1))
+    lastSlash = np.maximum.accumulate(np.where(data == ord("/"), position, -1))
+    return data[lastSlash <= lastSpace]
+
+def triangulate(indices, counts): # splits polygons into triangle fans, in the same order as pywavefront
+    if (counts < 3).any():
+        # lines and points have no area to render, so they are dropped
+        indices = indices[np.repeat(counts >= 3, counts)]
+        counts = counts[counts >= 3]
+    if (counts == 3).all():
+        return indices.reshape(-1, 3)
+    # polygon v1 v2 ... vn becomes (v1, v2, v3) followed by (vj, v1, vj-1) for every later vertex j
+    first = np.cumsum(counts) - counts
+    fans = counts - 2
+    polygon = np.repeat(np.arange(len(counts)), fans)
+    corner = np.arange(len(polygon)) - np.repeat(np.cumsum(fans) - fans, fans) # index of each triangle within its fan
+    base = first[polygon]
+    triangles = np.empty((len(polygon), 3), dtype=indices.dtype)
+    triangles[:, 0] = indices[base + np.where(corner == 0, 0, corner + 2)]
+    triangles[:, 1] = indices[base + np.where(corner == 0, 1, 0)]
+    triangles[:, 2] = indices[base + np.where(corner == 0, 2, corner + 1)]
+    return triangles
+
+def parseChunk(text): # parses the vertex and face lines of a block of text
+    # returns the vertices, the triangles, a mask of triangle indices that are relative to the vertices of this block, and the vertex count
+    # a copy is taken so the keyword of each line can be blanked out, with a newline appended so every line ends with one
+    data = np.frombuffer(text + b"\n", dtype=np.uint8).copy()
+    # blank out comments, from a # to the end of its line, so lines with trailing comments parse like any other
+    if b"#" in text:
+        position = np.arange(len(data), dtype=np.int64)
+        lastHash = np.maximum.accumulate(np.where(data == ord("#"), position, -1))
+        lastNewline = np.maximum.accumulate(np.where(data == 10, position, -1))
+        data[lastHash > lastNewline] = 32
+    ends = np.flatnonzero(data == 10) + 1
+    starts = np.concatenate(([0], ends[:-1]))
+    lengths = ends - starts
+    # classify lines by their first two bytes, keeping their order for negative (relative) indices
+    second = data[np.minimum(starts + 1, len(data) - 1)]
+    separator = (lengths > 1) & ((second == 32) | (second == 9))
+    isVertex = (data[starts] == ord("v")) & separator
+    isFace = (data[starts] == ord("f")) & separator
+    data[starts[isVertex | isFace]] = 32
+
+    vertexCount = int(isVertex.sum())
+    if vertexCount:
+        numbers, counts = parseNumbers(data[np.repeat(isVertex, lengths)], vertexCount, np.float64)
+        if counts.min() < 3:
+            raise ValueError("vertex with fewer than 3 coordinates in object file")
+        # only positions are kept, dropping optional w or vertex colour components
+        first = np.cumsum(counts) - counts
+        vertices = numbers.reshape(-1, 3) if (counts == 3).all() else numbers[first[:, None] + np.arange(3)]
+    else:
+        vertices = np.zeros((0, 3))
+
+    faceCount = int(isFace.sum())
+    if faceCount:
+        # keep only the vertex index of each face element
+        indices, counts = parseNumbers(dropSlashFields(data[np.repeat(isFace, lengths)]), faceCount, np.int64)
+        relative = indices < 0
+        # indices are 1-based, and negative indices count back from the last vertex read before the face
+        indices -= 1
+        if relative.any():
+            verticesBefore = (np.cumsum(isVertex) - isVertex)[isFace]
+            indices[relative] += np.repeat(verticesBefore, counts)[relative] + 1
+        faces = triangulate(indices, counts)
+        relative = triangulate(relative, counts)
+    else:
+        faces = np.zeros((0, 3), dtype=np.int64)
+        relative = np.zeros((0, 3), dtype=bool)
+    return (vertices, faces, relative, vertexCount)
+
+def parseRange(task): # reads and parses one byte range of a file
+    path, start, end = task
+    with open(path, "rb") as file:
+        file.seek(start)
+        return parseChunk(file.read(end - start))
+
+def parseObj(path, workers=None, size=chunkSize): # interprets an object file, returning its vertices and triangulated faces as arrays
+    tasks = [(path, start, end) for start, end in chunkRanges(path, size)]
+    pool = None
+    if len(tasks) > 1 and os.path.getsize(path) > parallelSize and workers != 1:
+        pool = Pool(processes=workers)
+    try:
+        results = pool.imap(parseRange, tasks) if pool else map(parseRange, tasks)
+        vertexBlocks = []
+        faceBlocks = []
+        vertexCount = 0
+        for vertices, faces, relative, count in results:
+            # relative indices were resolved within their chunk, so offset them by the vertices of earlier chunks
+            if vertexCount and relative.any():
+                faces[relative] += vertexCount
+            vertexCount += count
+            if len(faces) and (faces.min() < 0 or faces.max() >= vertexCount):
+                raise ValueError("face refers to a vertex that does not exist in object file")
+            vertexBlocks.append(vertices)
+            faceBlocks.append(faces.astype(np.uint32))
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    vertices = np.concatenate(vertexBlocks) if vertexBlocks else np.zeros((0, 3))
+    faces = np.concatenate(faceBlocks) if faceBlocks else np.zeros((0, 3), dtype=np.uint32)
+    return (vertices, faces)
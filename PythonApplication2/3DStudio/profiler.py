@@ -0,0 +1,114 @@
+# import necessary libraries
+import json
+import os
+import time
+from collections import deque
+
+# named timing spans around the stages of each frame, so a slow frame can be traced to the stage that caused it
+# spans nest, and each is named by its path from the outermost open span (for example "render/sort")
+# span times are summed per frame, and every span can be exported as a Chrome trace (open it at chrome://tracing or ui.perfetto.dev)
+# while profiling is disabled, starting a span returns a shared object that does nothing, so instrumented code runs at almost full speed
+
+# class standing in for a span while profiling is disabled
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        return False
+
+nullSpan = NullSpan()
+
+# class timing one stage while profiling is enabled, used as a context manager
+class Span:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.profiler.stack.append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        end = time.perf_counter()
+        self.profiler.stack.pop()
+        self.profiler.record(self.name, self.start, end)
+        return False
+
+# class collecting the spans of every frame
+class Profiler:
+    def __init__(self, maxFrames=1000, maxEvents=500000):
+        self.enabled = False
+        self.stack = [] # names of the spans currently open, outermost first
+        self.frames = deque(maxlen=maxFrames) # seconds spent in each span path during each finished frame
+        self.events = deque(maxlen=maxEvents) # every finished span as (path, start, end, process id), kept for trace export
+        self.current = {} # seconds spent in each span path during the frame in progress
+        self.frameStart = None
+
+    def enable(self): # starts recording spans, discarding any recorded before
+        self.enabled = True
+        self.stack = []
+        self.frames.clear()
+        self.events.clear()
+        self.current = {}
+        self.frameStart = time.perf_counter()
+
+    def disable(self): # stops recording spans, keeping those recorded so they can still be exported
+        # a frame with no spans recorded has only just started, so it is dropped rather than kept as an empty frame
+        if self.enabled and self.current:
+            self.frame()
+        self.enabled = False
+
+    def span(self, name): # returns a context manager timing the code it wraps
+        if not self.enabled:
+            return nullSpan
+        return Span(self, name)
+
+    def record(self, name, start, end, process=None): # adds a finished span nested in the spans currently open
+        # spans timed in worker processes pass their process id, using the same clock as this process
+        if not self.enabled:
+            return
+        path = "/".join(self.stack + [name])
+        self.current[path] = self.current.get(path, 0) + end - start
+        self.events.append((path, start, end, os.getpid() if process is None else process))
+
+    def frame(self): # ends the frame in progress and starts the next
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.current["frame"] = now - self.frameStart
+        self.events.append(("frame", self.frameStart, now, os.getpid()))
+        self.frames.append(self.current)
+        self.current = {}
+        self.frameStart = now
+
+    def averages(self, frames=None): # returns the mean seconds spent in each span path over the recorded frames (or the given frames) that entered it
+        totals = {}
+        counts = {}
+        for frame in self.frames if frames is None else frames:
+            for path, seconds in frame.items():
+                totals[path] = totals.get(path, 0) + seconds
+                counts[path] = counts.get(path, 0) + 1
+        return {path: seconds / counts[path] for path, seconds in sorted(totals.items())}
+
+    def exportTrace(self, path): # writes every recorded span to a Chrome trace event file
+        origin = min((start for _, start, _, _ in self.events), default=0)
+        mainProcess = os.getpid()
+        events = []
+        # name each process so worker processes are labelled in the trace viewer
+        for process in sorted({process for _, _, _, process in self.events}):
+            label = "renderer" if process == mainProcess else f"worker {process}"
+            events.append({"name": "process_name", "ph": "M", "pid": process, "tid": process, "args": {"name": label}})
+        # complete events, with times in microseconds from the first span
+        for name, start, end, process in self.events:
+            events.append({"name": name.rsplit("/", 1)[-1], "cat": name, "ph": "X", "pid": process, "tid": process,
+                           "ts": (start - origin) * 1e6, "dur": (end - start) * 1e6})
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "frameAverages": self.averages()}, file)
+
+# profiler shared by both renderers and the editor
+profiler = Profiler()
@@ -0,0 +1,99 @@
+# import necessary libraries
+import numpy as np
+import pygame
+
+# z-buffered alternative to drawing shapes one at a time with the painter's algorithm
+# shapes are rasterised into colour and depth arrays and the finished frame is copied to the window in one call
+# depth is stored as 1 / distance in front of the camera, so a cleared buffer (0) is infinitely far away
+
+pixelLimit = 1 << 20 # maximum number of pixels shaded at once, bounding temporary memory
+
+class Rasteriser:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.colour = np.zeros((height * width, 3), dtype=np.uint8)
+        self.depth = np.zeros(height * width)
+
+    def clear(self, colour): # fills the colour buffer and resets the depth buffer
+        self.colour[:] = np.clip(np.rint(colour), 0, 255).astype(np.uint8)
+        self.depth[:] = 0
+
+    def write(self, pixels, depth, colours): # keeps the nearest of each pixel's candidates that is nearer than what is already drawn
+        np.maximum.at(self.depth, pixels, depth)
+        nearest = depth == self.depth[pixels]
+        self.colour[pixels[nearest]] = np.clip(np.rint(colours[nearest]), 0, 255).astype(np.uint8)
+
+    def rows(self, top, bottom): # returns the shape and screen row of every row each shape covers, clipped to the screen
+        top = np.clip(np.floor(top), 0, self.height).astype(np.int64)
+        bottom = np.clip(np.ceil(bottom) + 1, 0, self.height).astype(np.int64)
+        counts = np.maximum(bottom - top, 0)
+        shape = np.repeat(np.arange(len(counts)), counts)
+        return (shape, top[shape] + np.arange(len(shape)) - np.repeat(np.cumsum(counts) - counts, counts))
+
+    def spans(self, shape, row, left, right): # splits row spans into batches of about pixelLimit pixels
+        # a pixel is covered if its centre lies between left and right, and each batch is yielded as (shape, x, y) for every covered pixel
+        start = np.maximum(np.ceil(left - 0.5), 0)
+        end = np.minimum(np.floor(right - 0.5) + 1, self.width)
+        keep = end > start
+        shape, row, start = shape[keep], row[keep], start[keep].astype(np.int64)
+        counts = end[keep].astype(np.int64) - start
+        total = np.cumsum(counts)
+        first = 0
+        while first < len(counts):
+            last = max(first + 1, int(np.searchsorted(total, total[first] - counts[first] + pixelLimit, side="right")))
+            length = counts[first:last]
+            span = np.repeat(np.arange(first, last), length)
+            offset = np.arange(len(span)) - np.repeat(np.cumsum(length) - length, length)
+            yield (shape[span], start[span] + offset, row[span])
+            first = last
+
+    def drawTriangles(self, corners, depths, colours): # rasterises triangles from their (F, 3, 2) screen corners and (F, 3) distances in front of the camera
+        x, y = corners[:, :, 0], corners[:, :, 1]
+        area = (x[:, 1] - x[:, 0]) * (y[:, 2] - y[:, 0]) - (x[:, 2] - x[:, 0]) * (y[:, 1] - y[:, 0])
+        keep = area != 0
+        x, y, depths, colours, area = x[keep], y[keep], depths[keep], colours[keep], area[keep]
+        # each edge function a * x + b * y + c is the barycentric weight of the opposite corner
+        # triangles may be wound either way, so dividing by the signed area makes them positive inside
+        j, k = [1, 2, 0], [2, 0, 1]
+        a = (y[:, j] - y[:, k]) / area[:, None]
+        b = (x[:, k] - x[:, j]) / area[:, None]
+        c = (x[:, j] * y[:, k] - x[:, k] * y[:, j]) / area[:, None]
+        # 1 / depth varies linearly across the screen, so it is a plane through the corners' weights
+        inverse = 1 / depths
+        planeX, planeY, planeC = (a * inverse).sum(axis=1), (b * inverse).sum(axis=1), (c * inverse).sum(axis=1)
+
+        # on each row every edge limits the span from one side, depending on the sign of its slope
+        triangle, row = self.rows(y.min(axis=1), y.max(axis=1))
+        rowA = a[triangle]
+        offset = b[triangle] * (row[:, None] + 0.5) + c[triangle]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossing = 0 - offset / rowA
+        left = np.where(rowA > 0, crossing, -np.inf).max(axis=1)
+        right = np.where(rowA < 0, crossing, np.inf).min(axis=1)
+        # an edge parallel to the row excludes the whole row if the row is outside it
+        right[((rowA == 0) & (offset < 0)).any(axis=1)] = -np.inf
+
+        for triangle, px, py in self.spans(triangle, row, left, right):
+            depth = planeX[triangle] * (px + 0.5) + planeY[triangle] * (py + 0.5) + planeC[triangle]
+            self.write(py * self.width + px, depth, colours[triangle])
+
+    def drawSpheres(self, centres, radii, depths, worldRadii, colours): # rasterises spheres as circles on the screen with a curved depth
+        # centres and radii are on the screen, depths and worldRadii are the distance of each centre in front of the camera and the sphere radius
+        sphere, row = self.rows(centres[:, 1] - radii, centres[:, 1] + radii)
+        dy = row + 0.5 - centres[sphere, 1]
+        halfWidth = np.sqrt(np.maximum(radii[sphere] ** 2 - dy * dy, 0))
+        halfWidth[np.abs(dy) > radii[sphere]] = -1
+        centreX = centres[sphere, 0]
+
+        for sphere, px, py in self.spans(sphere, row, centreX - halfWidth, centreX + halfWidth):
+            dx = px + 0.5 - centres[sphere, 0]
+            dy = py + 0.5 - centres[sphere, 1]
+            # how far across the circle each pixel lies, from 0 at the centre to 1 at the edge
+            across = np.minimum((dx * dx + dy * dy) / (radii[sphere] ** 2), 1)
+            # the front of the sphere bulges towards the camera by up to its radius
+            depth = 1 / np.maximum(depths[sphere] - worldRadii[sphere] * np.sqrt(1 - across), 1e-6)
+            self.write(py * self.width + px, depth, colours[sphere])
+
+    def blit(self, surface): # copies the finished frame to a surface in a single call
+        pygame.surfarray.blit_array(surface, self.colour.reshape(self.height, self.width, 3).swapaxes(0, 1))
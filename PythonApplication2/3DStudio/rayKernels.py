@@ -0,0 +1,119 @@
+# import necessary libraries
+import sys
+import numpy as np
+
+# batched versions of Ray.hitSphere and Ray.hitTriangle, intersecting many rays with many primitives at once
+# rays are given as (N, 3) arrays of origins and directions
+# each kernel returns (dist, index, normal): the distance to the closest hit of each ray (inf for a miss),
+# the index of the primitive that was hit (-1 for a miss) and the unit surface normal at the hit (zero for a miss)
+
+epsilon = sys.float_info.epsilon # small value to handle floating point precision errors
+pairLimit = 1 << 18 # maximum number of ray-primitive pairs tested at once, bounding temporary memory
+
+def dot(a, b): # dot product along the last axis, summed in the same order as Vect.dot
+    return a[..., 0] * b[..., 0] + a[..., 1] * b[..., 1] + a[..., 2] * b[..., 2]
+
+def cross(a, b): # cross product along the last axis, matching Vect.cross
+    return np.stack((a[..., 1] * b[..., 2] - a[..., 2] * b[..., 1],
+                     a[..., 2] * b[..., 0] - a[..., 0] * b[..., 2],
+                     a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]), axis=-1)
+
+def normalise(vectors): # returns unit vectors along the last axis, leaving zero vectors unchanged like Vect.normalise
+    mag = np.sqrt(dot(vectors, vectors))[..., None]
+    return np.divide(vectors, mag, out=vectors.copy(), where=mag != 0)
+
+def emptyHits(count): # returns hit arrays for rays that have not hit anything
+    return (np.full(count, np.inf), np.full(count, -1, dtype=np.int64), np.zeros((count, 3)))
+
+def keepClosest(bestDist, bestIndex, dist, offset): # updates the closest hits with a block of distances of shape (rays, primitives)
+    # argmin returns the first minimum, and only strictly closer hits replace earlier ones, so ties go to the lowest index like a linear scan
+    blockIndex = np.argmin(dist, axis=1)
+    blockDist = dist[np.arange(len(dist)), blockIndex]
+    closer = blockDist < bestDist
+    bestDist[closer] = blockDist[closer]
+    bestIndex[closer] = blockIndex[closer] + offset
+
+def sphereDistances(origins, directions, centres, radiiSq): # distance along each ray to a sphere, broadcasting rays against spheres (inf for a miss)
+    # coefficients for the quadratic equation
+    rayToCentre = origins - centres
+    a = dot(directions, directions)
+    b = 2 * dot(directions, rayToCentre)
+    c = dot(rayToCentre, rayToCentre) - radiiSq
+    discriminant = (b ** 2) - (4 * a * c)
+    with np.errstate(invalid="ignore"):
+        root = np.sqrt(discriminant)
+        root1 = (-b + root) / (2 * a)
+        root2 = (-b - root) / (2 * a)
+    # choose the closest positive intersection, or the positive one if only one root is positive
+    dist = np.where((root1 > 0) & (root2 > 0), np.minimum(root1, root2), np.maximum(root1, root2))
+    # discard rays with no real roots or with both intersections behind the origin
+    dist[(discriminant < 0) | ((root1 < 0) & (root2 < 0))] = np.inf
+    return dist
+
+def triangleDistances(origins, directions, p1, edge1, edge2): # distance along each ray to a triangle, broadcasting rays against triangles (inf for a miss)
+    # calculate determinant to check if the rays and triangles are parallel
+    rayCrossE2 = cross(directions, edge2)
+    det = dot(edge1, rayCrossE2)
+    parallel = (det > -epsilon) & (det < epsilon)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        invDet = 1 / det
+        # first barycentric coordinate
+        s = origins - p1
+        u = invDet * dot(s, rayCrossE2)
+        # second barycentric coordinate and distance along the ray
+        sCrossE1 = cross(s, edge1)
+        v = invDet * dot(directions, sCrossE1)
+        dist = invDet * dot(edge2, sCrossE1)
+        # the intersection lies outside the triangle if either coordinate or their sum is out of range
+        miss = parallel | ((u < 0) & (np.abs(u) > epsilon)) | ((u > 1) & (np.abs(u - 1) > epsilon))
+        miss |= ((v < 0) & (np.abs(v) > epsilon)) | ((u + v > 1) & (np.abs(u + v - 1) > epsilon))
+        # the intersection must also be in front of the ray origin
+        miss |= ~(dist > epsilon)
+    dist[miss] = np.inf
+    return dist
+
+def hitSpheres(origins, directions, centres, radii): # intersects every ray with every sphere by solving the quadratic
+    count = len(origins)
+    bestDist, bestIndex, normals = emptyHits(count)
+    if count == 0 or len(centres) == 0:
+        return (bestDist, bestIndex, normals)
+    origins = np.asarray(origins, dtype=np.float64)
+    directions = np.asarray(directions, dtype=np.float64)
+    step = max(1, pairLimit // count)
+
+    for start in range(0, len(centres), step):
+        centre = np.asarray(centres[start:start + step], dtype=np.float64)
+        radius = np.asarray(radii[start:start + step], dtype=np.float64)
+        dist = sphereDistances(origins[:, None, :], directions[:, None, :], centre[None, :, :], radius[None, :] ** 2)
+        keepClosest(bestDist, bestIndex, dist, start)
+
+    # compute surface normals only for the closest hits
+    hit = bestIndex >= 0
+    hitPoints = origins[hit] + directions[hit] * bestDist[hit, None]
+    normals[hit] = normalise(hitPoints - np.asarray(centres, dtype=np.float64)[bestIndex[hit]])
+    return (bestDist, bestIndex, normals)
+
+def hitTriangles(origins, directions, p1, edge1, edge2, triangleNormals=None): # intersects every ray with every triangle using Möller-Trumbore
+    # triangles are given by their first vertex and the two edges leaving it (p2 - p1 and p3 - p1)
+    count = len(origins)
+    bestDist, bestIndex, normals = emptyHits(count)
+    if count == 0 or len(p1) == 0:
+        return (bestDist, bestIndex, normals)
+    origins = np.asarray(origins, dtype=np.float64)
+    directions = np.asarray(directions, dtype=np.float64)
+    step = max(1, pairLimit // count)
+
+    for start in range(0, len(p1), step):
+        vertex = np.asarray(p1[start:start + step], dtype=np.float64)
+        e1 = np.asarray(edge1[start:start + step], dtype=np.float64)
+        e2 = np.asarray(edge2[start:start + step], dtype=np.float64)
+        dist = triangleDistances(origins[:, None, :], directions[:, None, :], vertex[None, :, :], e1[None, :, :], e2[None, :, :])
+        keepClosest(bestDist, bestIndex, dist, start)
+
+    # look up or compute surface normals only for the closest hits
+    hit = bestIndex >= 0
+    if triangleNormals is not None:
+        normals[hit] = triangleNormals[bestIndex[hit]]
+    else:
+        normals[hit] = normalise(cross(np.asarray(edge1, dtype=np.float64)[bestIndex[hit]], np.asarray(edge2, dtype=np.float64)[bestIndex[hit]]))
+    return (bestDist, bestIndex, normals)
@@ -1,8 +1,13 @@
 # import necessary libraries
 import math
+import numpy as np
 import pygame
-import pywavefront
 from utilities import *
+from rayKernels import normalise
+from meshCache import loadMesh
+from indexedMesh import meshFromTriangles, lodChain, combineMeshes
+from rasteriser import Rasteriser
+from profiler import profiler
 
 # class representing a 3D triangle
 class Triangle:
@@ -13,25 +18,6 @@ class Triangle:
         self.colour = colour
         self.rtArgs = rtArgs # rendering attributes (["Triangle", shine, emission])
 
-    def render(self, renderer): # renders the triangle to the screen
-        if self.rtArgs[2] == 0: # if the triangle is not emissive
-            # calculate distance from light source to determine shading
-            distance = calculateDistance((self.p1 + self.p2 + self.p3) / 3, renderer.camPos / 10)
-            distance = 1 + abs(distance / 100)
-            shade = (self.colour[0] / distance, self.colour[1] / distance, self.colour[2] / distance)
-            shade = (shade[0] * 255, shade[1] * 255, shade[2] * 255)
-        else: # if the triangle is emissive, use its original colour instead
-            shade = (self.colour[0] * 255, self.colour[1] * 255, self.colour[2] * 255)
-
-        # project and render the triangle to the 2D screen
-        pygame.draw.polygon(renderer.window, shade, (tuple(map(sum, zip(renderer.project(self.p1), renderer.globalTranslate))), 
-                                                       tuple(map(sum, zip(renderer.project(self.p2), renderer.globalTranslate))), 
-                                                       tuple(map(sum, zip(renderer.project(self.p3), renderer.globalTranslate)))))
-    
-    def getDistance(self, renderer): # calculates the distance of the triangle from the renderer camera
-        # take an average of the x, y, and z components of the points, and use this point to calculate distance
-        return calculateDistance((self.p1 + self.p2 + self.p3) / 3, renderer.camPos)
-
 # class representing a 3D sphere
 class Sphere:
     def __init__(self, centre: Vect, radius, colour, rtArgs):
@@ -40,34 +26,6 @@ class Sphere:
         self.colour = colour
         self.rtArgs = rtArgs # rendering attributes (["Sphere", shine, emission])
 
-    def render(self, renderer): # renders the sphere to the screen
-        if self.rtArgs[2] == 0: # if sphere is not emissive
-            # calculate distance from renderer camera to determine shading
-            distance = calculateDistance(self.centre, renderer.camPos / 10)
-            distance = 1 + abs(distance / 100)
-            shade = (self.colour[0] / distance, self.colour[1] / distance, self.colour[2] / distance)
-            shade = (shade[0] * 255, shade[1] * 255, shade[2] * 255)
-        else:
-            # if sphere is not emissive, use original colour
-            shade = (self.colour[0] * 255, self.colour[1] * 255, self.colour[2] * 255)
-
-        # project the sphere's centre to the 2D screen
-        projectedCentre = tuple(map(sum, zip(renderer.project(self.centre), renderer.globalTranslate)))
-        # project an outer point and use the distance to calculate a radius approximation
-        projectedOuterPoint = tuple(map(sum, zip(renderer.project(self.centre + Vect(self.radius, 0, 0)), renderer.globalTranslate)))
-        radius = math.sqrt((projectedOuterPoint[0] - projectedCentre[0])**2 + (projectedOuterPoint[1] - projectedCentre[1])**2)
-        # project another point and take an average of the two for a more accurate radius approximation
-        projectedOuterPoint = tuple(map(sum, zip(renderer.project(self.centre + Vect(0, self.radius, 0)), renderer.globalTranslate)))
-        radius = (math.sqrt((projectedOuterPoint[0] - projectedCentre[0])**2 + (projectedOuterPoint[1] - projectedCentre[1])**2) + radius) / 2
-
-        # draw the projected shape to the 2D screen
-        pygame.draw.circle(renderer.window, shade, 
-                               (int(projectedCentre[0]), int(projectedCentre[1])), 
-                               radius)
-    
-    def getDistance(self, renderer): # calculates the distance from the centre of the circle to the renderer camera
-        return calculateDistance(self.centre, renderer.camPos)
-
 # function to collect and return all spheres from a list of different objects
 def extractSpheres(list):
     extracted = []
@@ -95,9 +53,184 @@ def zRotate(coord, angle): # simulates matrix multiplication with z rotation mat
     newZ = coord.z
     return Vect(newX, newY, newZ)
 
+def rotationMatrix(xAngle, yAngle, zAngle): # combines the x, then y, then z rotation matrices into one matrix
+    xCos, xSin = math.cos(xAngle), math.sin(xAngle)
+    yCos, ySin = math.cos(yAngle), math.sin(yAngle)
+    zCos, zSin = math.cos(zAngle), math.sin(zAngle)
+    xMatrix = np.array([[1, 0, 0], [0, xCos, -xSin], [0, xSin, xCos]])
+    yMatrix = np.array([[yCos, 0, ySin], [0, 1, 0], [-ySin, 0, yCos]])
+    zMatrix = np.array([[zCos, -zSin, 0], [zSin, zCos, 0], [0, 0, 1]])
+    return zMatrix @ yMatrix @ xMatrix
+
+# class holding the shapes of a scene packed into arrays so they can be transformed and shaded together
+class ShapeBuffer:
+    def __init__(self, mesh, spheres):
+        self.mesh = mesh # indexed mesh of every triangle
+        self.spheres = spheres
+        self.triangleCentroids = mesh.vertices[mesh.faces].sum(axis=1) / 3
+        self.sphereCentres = np.array([(s.centre.x, s.centre.y, s.centre.z) for s in self.spheres], dtype=np.float64).reshape(-1, 3)
+        self.sphereRadii = np.array([s.radius for s in self.spheres], dtype=np.float64)
+        self.sphereColours = np.array([s.colour for s in self.spheres], dtype=np.float64).reshape(-1, 3)
+        self.sphereEmissive = np.array([s.rtArgs[2] != 0 for s in self.spheres], dtype=bool)
+        # centre of every shape used for depth ordering, with spheres numbered after the triangles
+        self.centroids = np.concatenate((self.triangleCentroids, self.sphereCentres))
+        self.colours = np.concatenate((mesh.colours, self.sphereColours))
+        self.emissive = np.concatenate((mesh.emissive, self.sphereEmissive))
+
+        # bounding sphere of each connected piece of the mesh, so whole objects can be culled at once
+        self.pieces, pieceCount = mesh.components()
+        corners = mesh.vertices[mesh.faces]
+        low = np.full((pieceCount, 3), np.inf)
+        high = np.full((pieceCount, 3), -np.inf)
+        for corner in range(3):
+            np.minimum.at(low, self.pieces, corners[:, corner])
+            np.maximum.at(high, self.pieces, corners[:, corner])
+        self.pieceCentres = (low + high) / 2
+        self.pieceRadii = np.zeros(pieceCount)
+        for corner in range(3):
+            np.maximum.at(self.pieceRadii, self.pieces, np.sqrt(((corners[:, corner] - self.pieceCentres[self.pieces]) ** 2).sum(axis=1)))
+        # only faces of closed pieces can be back-face culled, since the inside of an open surface can be seen
+        closed, outwards = mesh.closedPieces(self.pieces, pieceCount)
+        self.cullable = closed[self.pieces]
+        self.outwards = outwards[self.pieces]
+
+    def __len__(self): # returns the number of shapes in the buffer
+        return len(self.mesh) + len(self.spheres)
+
+    @staticmethod
+    def combine(buffers): # joins the packed shapes of several groups into one buffer, with all triangles numbered before all spheres
+        if len(buffers) == 1:
+            return buffers[0]
+        combined = ShapeBuffer.__new__(ShapeBuffer)
+        combined.mesh = combineMeshes([buffer.mesh for buffer in buffers])
+        combined.spheres = [sphere for buffer in buffers for sphere in buffer.spheres]
+        for name in ["triangleCentroids", "sphereCentres", "sphereColours", "pieceCentres"]:
+            setattr(combined, name, np.concatenate([getattr(buffer, name) for buffer in buffers]).reshape(-1, 3))
+        for name in ["sphereRadii", "sphereEmissive", "pieceRadii", "cullable", "outwards"]:
+            setattr(combined, name, np.concatenate([getattr(buffer, name) for buffer in buffers]))
+        combined.centroids = np.concatenate((combined.triangleCentroids, combined.sphereCentres))
+        combined.colours = np.concatenate((combined.mesh.colours, combined.sphereColours))
+        combined.emissive = np.concatenate((combined.mesh.emissive, combined.sphereEmissive))
+        # pieces of each group are numbered after the pieces of the groups before it
+        offsets = np.cumsum([0] + [len(buffer.pieceRadii) for buffer in buffers[:-1]])
+        combined.pieces = np.concatenate([buffer.pieces + offset for buffer, offset in zip(buffers, offsets)])
+        return combined
+
+# class for a group of shapes added to the scene together, such as an imported mesh, holding its chain of simplified meshes
+# the chain is built once when the group is created, so changing the rest of the scene never simplifies the group again
+class ShapeGroup:
+    def __init__(self, shapes, simplify=True):
+        self.shapes = unnest([shapes]) # remove nesting in polygon array before processing
+        self.spheres = extractSpheres(self.shapes)
+        mesh = meshFromTriangles([shape for shape in self.shapes if type(shape) == Triangle])
+        # meshes from full detail down to the coarsest simplification, or only full detail for groups that are not simplified
+        self.chain = lodChain(mesh) if simplify else [mesh]
+
+    def __len__(self): # returns the number of shapes in the group
+        return len(self.shapes)
+
+    def shapeCount(self, level): # returns the number of shapes in a level without building it
+        if level < 0:
+            return len(self.chain[min(0 - level, len(self.chain) - 1)]) + len(self.spheres)
+        # each subdivision splits every triangle into 4
+        return len(self.chain[0]) * 4 ** level + len(self.spheres)
+
+    def build(self, level): # returns the packed shapes of a level
+        # groups with a shorter chain stay at their coarsest mesh at levels beyond it
+        mesh = self.chain[min(max(0, 0 - level), len(self.chain) - 1)]
+        # neighbouring triangles share their edge midpoints, so each level adds one vertex per edge
+        for _ in range(level):
+            mesh = mesh.subdivide()
+        return ShapeBuffer(mesh, self.spheres)
+
+# class keeping the levels of detail of every group of shapes in a scene, so each level of a group is only built once
+# positive levels subdivide the triangles and negative levels use each group's chain of simplified meshes
+class LodCache:
+    def __init__(self, maxShapes=200000):
+        self.maxShapes = maxShapes # bound on the total number of shapes held across all cached levels
+        self.levels = {} # packed shapes of each group and level, ordered from least to most recently used
+        self.cachedShapes = 0 # total number of shapes held in levels
+        self.scene = None
+        self.sceneSize = 0
+        self.groups = [] # groups of the scene being drawn
+        self.counts = {} # number of shapes in each level of the whole scene
+        self.combined = None # packed shapes of every group joined together at the current level
+        self.combinedLevel = None
+
+    def update(self, allShapes): # reads the scene again if it has changed, given as a list of shape groups or a plain list of shapes
+        # the editor's scene hands over a new list whenever it changes, and a plain list is read again if it is a different list or resized
+        if allShapes is self.scene and len(allShapes) == self.sceneSize:
+            return
+        self.scene = allShapes
+        self.sceneSize = len(allShapes)
+        if len(allShapes) and type(allShapes[0]) == ShapeGroup:
+            self.groups = list(allShapes)
+        else:
+            self.groups = [ShapeGroup(allShapes)]
+        self.counts = {}
+        self.combined = None
+
+    def shapeCount(self, level): # returns the number of shapes in a level of the whole scene without building it
+        if level not in self.counts:
+            self.counts[level] = sum(group.shapeCount(level) for group in self.groups)
+        return self.counts[level]
+
+    def chooseLevel(self, polyGoal, visibleFraction=1): # returns the most detailed level expected to draw no more than polyGoal shapes, or the coarsest level
+        # only visible shapes are drawn, so the budget stretches by the fraction that was visible in the last frame
+        polyGoal /= max(visibleFraction, 1 / 16)
+        level = 0
+        coarsest = 1 - max(len(group.chain) for group in self.groups)
+        if self.shapeCount(0) > polyGoal:
+            while level > coarsest and self.shapeCount(level) > polyGoal:
+                level -= 1
+        elif any(len(group.chain[0]) > 0 for group in self.groups):
+            while self.shapeCount(level + 1) <= polyGoal:
+                level += 1
+        return level
+
+    def get(self, level): # returns the packed shapes of every group at a level, building any that are not cached
+        if self.combined is None or self.combinedLevel != level:
+            self.combined = ShapeBuffer.combine([self.groupLevel(group, level) for group in self.groups])
+            self.combinedLevel = level
+        return self.combined
+
+    def groupLevel(self, group, level): # returns the packed shapes of one group at a level, building them if they are not cached
+        key = (group, level)
+        buffer = self.levels.pop(key, None)
+        if buffer is None:
+            buffer = group.build(level)
+            self.cachedShapes += len(buffer)
+        self.levels[key] = buffer
+        # evict the least recently used levels until the cache is within its bound, always keeping the level just used
+        while len(self.levels) > 1 and self.cachedShapes > self.maxShapes:
+            self.cachedShapes -= len(self.levels.pop(next(iter(self.levels))))
+        return buffer
+
+# class keeping the painter's algorithm draw order of a shape buffer between frames
+class DepthOrder:
+    def __init__(self):
+        self.buffer = None
+        self.order = np.zeros(0, dtype=np.int64)
+
+    def sort(self, buffer, camPos, visible): # returns the indices of visible shapes in descending order of distance from the camera
+        if buffer is not self.buffer:
+            # the scene has changed, so the previous order no longer applies
+            self.buffer = buffer
+            self.order = np.arange(len(buffer))
+        # depths are visited in the previous frame's order, which is already sorted or nearly sorted while the camera moves slowly
+        shown = visible[self.order]
+        order = self.order[shown]
+        depths = np.sqrt(((buffer.centroids[order] - np.array([camPos.x, camPos.y, camPos.z])) ** 2).sum(axis=1))
+        if (depths[:-1] < depths[1:]).any():
+            # a stable sort runs in close to linear time on nearly sorted input
+            order = order[np.argsort(-depths, kind="stable")]
+        # hidden shapes keep their previous relative order after the visible ones, ready for when they come back into view
+        self.order = np.concatenate((order, self.order[~shown]))
+        return order
+
 # main real-time renderer class
 class RealtimeRenderer:
-    def __init__(self, window, focalLength, baseCamPos: Vect, polyGoal, skyTint, skyLight, globalTranslate, demoMode):
+    def __init__(self, window, focalLength, baseCamPos: Vect, polyGoal, skyTint, skyLight, globalTranslate, demoMode, backend="painter"):
         # initialises renderer with camera settings, environment, and other configurations
         self.window = window
         self.xRotation = 0
@@ -115,6 +248,12 @@ class RealtimeRenderer:
         self.globalTranslate = globalTranslate
         self.demoMode = demoMode
         self.rotationLock = False
+        self.visibleFraction = 1 # fraction of the shapes drawn in the last frame, used to choose the level of detail
+        self.lodCache = LodCache()
+        self.depthOrder = DepthOrder()
+        self.backend = backend # "painter" draws shapes back to front, "zbuffer" rasterises them into a depth buffer
+        self.rasteriser = None
+        self.nearPlane = 1 # distance in front of the camera that both backends clip triangles against
         
     def update(self):
         # get mouse position and update renderer rotation values based on mouse x and y 
@@ -138,17 +277,68 @@ class RealtimeRenderer:
     def getTriangle(self, p1: Vect, p2: Vect, p3: Vect, colour, shine, emission): # returns a realtime renderer triangle object with given parameters
         return Triangle(p1, p2, p3, colour, ["Triangle", shine, emission])
 
-    def project(self, coord): # calculates 2D projection x and y of a point in 3D space, applying renderer rotation values
-        coord = xRotate(coord, self.xRotation)
-        coord = yRotate(coord, self.yRotation)
-        coord = zRotate(coord, self.zRotation)
-        coord.z -= 200
+    def viewPoints(self, points): # rotates an (N, 3) array of points and moves them so the camera is at the origin, looking down negative z
+        points = points @ rotationMatrix(self.xRotation, self.yRotation, self.zRotation).T
+        points[:, 2] -= 200
+        return points
+
+    def projectPoints(self, points): # calculates the screen position of an (N, 3) array of points, including the global translation
+        return self.projectView(self.viewPoints(points))
+
+    def projectView(self, points): # calculates the screen position of points that have already been moved into view space
+        depth = points[:, 2].copy()
         # if dZ is 0, offset by a small amount to prevent division by zero errors
-        if coord.z == 0:
-            coord.z = 0.0001
-        # return calculated projection
-        return (0 - (self.focalLength * (coord.x / coord.z)) + self.winWidth / 2,
-                0 - (self.focalLength * (coord.y / coord.z)) + self.winHeight / 2)
+        depth[depth == 0] = 0.0001
+        return np.stack((self.winWidth / 2 + self.globalTranslate[0] - self.focalLength * points[:, 0] / depth,
+                         self.winHeight / 2 + self.globalTranslate[1] - self.focalLength * points[:, 1] / depth), axis=1)
+
+    def outsideView(self, centres, radii): # returns which spheres, given in view space, lie entirely behind the camera or off the screen
+        # the screen edges as slopes of x / -z and y / -z, matching the projection in projectView
+        left = (0 - self.winWidth / 2 - self.globalTranslate[0]) / self.focalLength
+        right = (self.winWidth / 2 - self.globalTranslate[0]) / self.focalLength
+        top = (0 - self.winHeight / 2 - self.globalTranslate[1]) / self.focalLength
+        bottom = (self.winHeight / 2 - self.globalTranslate[1]) / self.focalLength
+        # planes through the camera with normals pointing into the view, plus the camera plane itself
+        planes = normalise(np.array([[1, 0, left], [-1, 0, 0 - right], [0, 1, top], [0, -1, 0 - bottom], [0, 0, -1]], dtype=np.float64))
+        return ((centres @ planes.T) < 0 - radii[:, None]).any(axis=1)
+
+    def cullShapes(self, buffer, view, screen, sphereScreen, sphereRadii): # returns which shapes of a buffer need to be drawn, with spheres numbered after the triangles
+        mesh = buffer.mesh
+        # whole pieces of the mesh whose bounding sphere is out of view are rejected before testing their faces
+        pieceVisible = ~self.outsideView(self.viewPoints(buffer.pieceCentres), buffer.pieceRadii)
+        visible = pieceVisible[buffer.pieces]
+        faces = mesh.faces[visible]
+        depths = view[faces, 2]
+        # faces are clipped against the near plane when drawn, so only faces with every corner behind it are not drawn
+        inFront = (depths < 0 - self.nearPlane).any(axis=1)
+        corners = screen[faces]
+        # faces entirely to one side of the screen are not drawn
+        onScreen = ~(((corners[:, :, 0] < 0).all(axis=1)) | ((corners[:, :, 0] > self.winWidth).all(axis=1)) |
+                     ((corners[:, :, 1] < 0).all(axis=1)) | ((corners[:, :, 1] > self.winHeight).all(axis=1)))
+        # faces of closed pieces wound clockwise on screen face away from the camera, and are hidden behind the faces that face it
+        area = ((corners[:, 1, 0] - corners[:, 0, 0]) * (corners[:, 2, 1] - corners[:, 0, 1]) -
+                (corners[:, 2, 0] - corners[:, 0, 0]) * (corners[:, 1, 1] - corners[:, 0, 1]))
+        clockwise = area > 0
+        # corners behind the camera land on the wrong side of the screen, so faces crossing the camera plane are kept on screen
+        # and their winding is read from view space, where the sign of the corners' determinant is flipped by their negative depths
+        crossing = ~(depths < 0).all(axis=1)
+        onScreen |= crossing
+        clockwise[crossing] = np.linalg.det(view[faces[crossing]]) < 0
+        facing = ~buffer.cullable[visible] | (clockwise == buffer.outwards[visible])
+        visible[visible] = inFront & onScreen & facing
+
+        # spheres are drawn if any of the sphere is in front of the camera and its projected circle reaches the screen
+        sphereVisible = ~self.outsideView(self.viewPoints(buffer.sphereCentres), buffer.sphereRadii)
+        sphereVisible &= ((sphereScreen[:, 0] + sphereRadii >= 0) & (sphereScreen[:, 0] - sphereRadii <= self.winWidth) &
+                          (sphereScreen[:, 1] + sphereRadii >= 0) & (sphereScreen[:, 1] - sphereRadii <= self.winHeight))
+        return np.concatenate((visible, sphereVisible))
+
+    def shadePoints(self, points, colours, emissive): # calculates the drawn colour of shapes from their centres, shading by distance from the light source
+        light = np.array([self.camPos.x, self.camPos.y, self.camPos.z]) / 10
+        distance = 1 + np.sqrt(((points - light) ** 2).sum(axis=1)) / 100
+        # emissive shapes keep their original colour
+        distance[emissive] = 1
+        return colours / distance[:, None] * 255
 
     def globalRotate(self): # update renderer rotation values
         # if rotation lock is enabled, return no rotation
@@ -160,66 +350,6 @@ class RealtimeRenderer:
         self.zRotation = 0
         return (self.xRotation, self.yRotation, self.zRotation)
 
-    def subdivide(self, triangles, amount): # function to split a triangle into smaller component triangles
-        triangles = unnest([triangles]) # remove nesting in polygon array before processing
-        # remove and store all spheres
-        extracted = extractSpheres(triangles)
-        triangles = list(filter(lambda i:type(i) is Triangle, triangles))
-        # repeat subdivision by specified amount
-        for _ in range(amount):
-            triangles = unnest([triangles])
-            temp = []
-            for t in triangles:
-                # create new triangles using midpoints of outer triangle calculated by averaging coordinate components
-                part1 = Triangle(t.p1,
-                                 (t.p1 + t.p2) / 2,
-                                 (t.p1 + t.p3) / 2,
-                                 t.colour, t.rtArgs)
-                part2 = Triangle((t.p1 + t.p2) / 2,
-                                 t.p2,
-                                 (t.p2 + t.p3) / 2,
-                                 t.colour, t.rtArgs)
-                part3 = Triangle((t.p1 + t.p3) / 2,
-                                 (t.p2 + t.p3) / 2,
-                                 t.p3,
-                                 t.colour, t.rtArgs)
-                part4 = Triangle((t.p1 + t.p2) / 2,
-                                 (t.p2 + t.p3) / 2,
-                                 (t.p1 + t.p3) / 2,
-                                 t.colour, t.rtArgs)
-                temp.extend([part1, part2, part3, part4])
-            # replace triangles with array of new smaller triangles
-            triangles = temp
-        # add previously removed spheres back to shape array
-        triangles.extend(extracted)
-        return [triangles]
-    
-    def group(self, triangles, amount): # function to combine a set of 4 triangles by taking their outer points
-        triangles = unnest([triangles]) # remove nesting in polygon array before processing
-        # remove and store all spheres
-        extracted = extractSpheres(triangles)
-        triangles = list(filter(lambda i:type(i) is Triangle, triangles))
-        # repeat grouping by specified amount
-        for _ in range(amount):
-            triangles = unnest([triangles])
-            temp = []
-            # iterate through triangles in groups of 4
-            for j in range(math.floor(len(triangles) / 4)):
-                # select the 4 sequential triangles
-                t1 = triangles[(4 * j) - 4]
-                t2 = triangles[(4 * j) - 3]
-                t3 = triangles[(4 * j) - 2]
-                t4 = triangles[(4 * j) - 1]
-                # create new triangle from outer points of the 4 triangles
-                temp.append(Triangle(t1.p1,
-                                     t2.p2,
-                                     t3.p3,
-                                     t4.colour, t4.rtArgs))
-            triangles = temp
-        # add spheres back to array
-        triangles.extend(extracted)
-        return [triangles]
-
     def createQuad(self, p1: Vect, p2: Vect, p3: Vect, p4: Vect, colour, rtArgs): # function to create a quadrilateral from 2 triangles
         # get distance of quadrilateral centre to pass shading value into component triangles
         distance = calculateDistance((p1 + p2 + p3 + p4) / 4, self.camPos / 10)
@@ -264,25 +394,17 @@ class RealtimeRenderer:
                                colour, rtArgs)]
 
     def trianglesFromMesh(self, mesh, faces, sf, colour, rtArgs): # take mesh from interpreted object file and translate to an array of triangle objects
-        triangles = []
-        for face in faces:
-            temp = []
-            for i in range(3):
-                temp.append(mesh[face[i]])
-            # create triangle from vertices of a face
-            triangles.append(Triangle(Vect(temp[0][0] * sf, temp[0][1] * sf, temp[0][2] * sf), 
-                                      Vect(temp[1][0] * sf, temp[1][1] * sf, temp[1][2] * sf), 
-                                      Vect(temp[2][0] * sf, temp[2][1] * sf, temp[2][2] * sf), 
-                                      colour, rtArgs))
-        return triangles # return triangle object
+        # scale the corners of every face together, then take them three at a time to create each triangle
+        corners = iter(VectorBatch(mesh[faces.reshape(-1)]) * sf)
+        return [Triangle(next(corners), next(corners), next(corners), colour, rtArgs) for _ in range(len(faces))]
 
     def load(self, obj, sf, colour, rtArgs): # get triangles from a specified object file
         if obj == 0:
             return 0
         else:
-            # interpret object file with pywavefront
-            data = pywavefront.Wavefront(obj, collect_faces = True)
-            triangles = self.trianglesFromMesh(data.vertices, [face for mesh in data.mesh_list for face in mesh.faces], sf, colour, rtArgs)
+            # get the vertex and face arrays of the object file, from its binary cache if it has not changed
+            vertices, faces = loadMesh(obj)
+            triangles = self.trianglesFromMesh(vertices, faces, sf, colour, rtArgs)
             return[triangles]
 
     def setup(self, obj): # function to set up the shapes based on any input object mesh
@@ -311,38 +433,109 @@ class RealtimeRenderer:
         # update drawn sky colour based on light intensity and tint
         skyColour = tuple([(170 * self.skyLight) * x for x in self.skyTint])
         skyColour = tuple(min(255, max(0, c)) for c in skyColour) # clamps values in the range 0-255
-        self.window.fill(skyColour) # draws sky
+        if self.backend != "zbuffer":
+            with profiler.span("clear"):
+                self.window.fill(skyColour) # draws sky
         
-        # depending on subdivisionAmount, either subdivide or group shapes
-        if self.subdivisionAmount >= 0:
-            allShapes = self.subdivide(allShapes, self.subdivisionAmount) # perform subdivision the shapes
-        else:
-            allShapes = self.group(allShapes, 0 - self.subdivisionAmount) # perform grouping on the shapes
+        # pick the level of detail from the known size of each level, subdividing small scenes and simplifying large ones
+        # reading a changed scene unnests and groups its shapes, while building a level subdivides or simplifies them
+        with profiler.span("scene"):
+            self.lodCache.update(allShapes)
+        self.subdivisionAmount = self.lodCache.chooseLevel(self.polyGoal, self.visibleFraction)
+        with profiler.span("level of detail"):
+            buffer = self.lodCache.get(self.subdivisionAmount)
 
-        allShapes = unnest(allShapes) # remove any nesting in the shape array
-        
-        if len(allShapes) <= (self.polyGoal / 4) and self.lastPolyCount <= self.polyGoal:
-            # increase subdivision if the number of shapes is below 1/4 of the polygon limit
-            self.subdivisionAmount += 1
-        if len(allShapes) > self.polyGoal:
-            # decrease subdivision if the number of shapes exceeds the polygon limit
-            self.subdivisionAmount -= 1
-        # update lastPolyCount to store number of shapes in the scene
-        self.lastPolyCount = len(allShapes)
-    
-        # calculate the distances of each shape from the camera
-        distances = []
-        for i in range(len(allShapes)):
-            # add all distances to an array with an identifier corresponding to the position of each triangle in allShapes
-            distances.append([i, allShapes[i].getDistance(self)])
-        # sort shapes in descending order according to the distances (item 1 of each sub array)
-        distances = mergeSort(distances, True, 1) 
-
-        sortedShapes = []
-        for j in range(len(distances)):
-            # append shapes to sorted shapes based on the order of their sorted distances
-            sortedShapes.append(allShapes[distances[j][0]])
-    
-        # render each shape to the screen in their distance defined order
-        for shape in sortedShapes:
-            shape.render(self)
\ No newline at end of file
+        with profiler.span("project"):
+            # project every shared vertex once
+            mesh = buffer.mesh
+            triangleCount = len(mesh)
+            view = self.viewPoints(mesh.vertices)
+            screen = self.projectView(view)
+            # project each sphere's centre along with outer points in x and y, using the average projected distance as its radius
+            centres = buffer.sphereCentres
+            radii = buffer.sphereRadii[:, None]
+            projectedCentres = self.projectPoints(centres)
+            radiusX = np.sqrt(((self.projectPoints(centres + radii * np.array([1, 0, 0])) - projectedCentres) ** 2).sum(axis=1))
+            radiusY = np.sqrt(((self.projectPoints(centres + radii * np.array([0, 1, 0])) - projectedCentres) ** 2).sum(axis=1))
+            sphereRadii = (radiusY + radiusX) / 2
+
+        # cull shapes that cannot be seen before ordering them, so only drawn shapes count towards the polygon limit
+        with profiler.span("cull"):
+            visible = self.cullShapes(buffer, view, screen, projectedCentres, sphereRadii)
+        self.lastPolyCount = int(visible.sum())
+        self.visibleFraction = self.lastPolyCount / len(buffer) if len(buffer) else 1
+        if self.backend == "zbuffer":
+            self.rasterise(buffer, view, screen, projectedCentres, sphereRadii, visible, skyColour)
+            return
+        # the distance of each shape from the camera is computed while sorting
+        with profiler.span("sort"):
+            order = self.depthOrder.sort(buffer, self.camPos, visible)
+
+        with profiler.span("shade"):
+            # gather the shade and outline of each drawn shape in draw order
+            shades = self.shadePoints(buffer.centroids[order], buffer.colours[order], buffer.emissive[order]).tolist()
+            isTriangle = order < triangleCount
+            # faces crossing the near plane are clipped into one or two triangles, kept together in draw order
+            triangles, source = self.clipTriangles(view[mesh.faces[order[isTriangle]]])
+            arrangement = np.argsort(source, kind="stable")
+            corners = iter(self.projectView(triangles[arrangement].reshape(-1, 3)).reshape(-1, 3, 2).tolist())
+            pieces = iter(np.bincount(source, minlength=int(isTriangle.sum())).tolist())
+            spheres = order[~isTriangle] - triangleCount
+            circles = iter(zip(projectedCentres[spheres].astype(int).tolist(), sphereRadii[spheres].tolist()))
+
+        # render each shape to the screen in descending order of distance from the camera
+        with profiler.span("draw"):
+            for triangle, shade in zip(isTriangle.tolist(), shades):
+                if triangle:
+                    for _ in range(next(pieces)):
+                        pygame.draw.polygon(self.window, shade, next(corners))
+                else:
+                    centre, radius = next(circles)
+                    pygame.draw.circle(self.window, shade, centre, radius)
+
+    def rasterise(self, buffer, view, screen, sphereScreen, sphereRadii, visible, skyColour): # draws the visible shapes through the depth buffer, so they need no ordering
+        if self.rasteriser is None or (self.rasteriser.width, self.rasteriser.height) != (self.winWidth, self.winHeight):
+            self.rasteriser = Rasteriser(self.winWidth, self.winHeight)
+        with profiler.span("clear"):
+            self.rasteriser.clear(skyColour)
+        triangleCount = len(buffer.mesh)
+        with profiler.span("shade"):
+            shown = np.flatnonzero(visible)
+            shades = self.shadePoints(buffer.centroids[shown], buffer.colours[shown], buffer.emissive[shown])
+
+        with profiler.span("draw"):
+            # triangles are clipped against the near plane, then use the distance of each corner in front of the camera
+            isTriangle = shown < triangleCount
+            faces = buffer.mesh.faces[shown[isTriangle]]
+            triangles, source = self.clipTriangles(view[faces])
+            corners = self.projectView(triangles.reshape(-1, 3)).reshape(-1, 3, 2)
+            self.rasteriser.drawTriangles(corners, 0 - triangles[:, :, 2], shades[isTriangle][source])
+
+            # spheres whose centre is behind the camera cannot be given a depth, so only spheres in front are drawn
+            spheres = shown[~isTriangle] - triangleCount
+            depths = 0 - self.viewPoints(buffer.sphereCentres[spheres])[:, 2]
+            inFront = depths > 0
+            spheres = spheres[inFront]
+            self.rasteriser.drawSpheres(sphereScreen[spheres], sphereRadii[spheres], depths[inFront],
+                                        buffer.sphereRadii[spheres], shades[~isTriangle][inFront])
+        with profiler.span("blit"):
+            self.rasteriser.blit(self.window)
+
+    def clipTriangles(self, points): # clips (F, 3, 3) view space triangles against the near plane, returning the triangles in front of it and the index each came from
+        inFront = points[:, :, 2] < 0 - self.nearPlane
+        frontCount = inFront.sum(axis=1)
+        whole = np.flatnonzero(frontCount == 3)
+        crossing = np.flatnonzero((frontCount == 1) | (frontCount == 2))
+        one = frontCount[crossing] == 1
+        # each crossing triangle is rotated so the corner alone on its side of the plane comes first, which keeps its winding
+        alone = np.where(one, inFront[crossing].argmax(axis=1), (~inFront[crossing]).argmax(axis=1))
+        order = (alone[:, None] + np.arange(3)) % 3
+        a, b, c = np.moveaxis(np.take_along_axis(points[crossing], order[:, :, None], axis=1), 1, 0)
+        # the edges from the lone corner are cut where they reach the near plane
+        ab = a + (b - a) * ((0 - self.nearPlane - a[:, 2]) / (b[:, 2] - a[:, 2]))[:, None]
+        ac = a + (c - a) * ((0 - self.nearPlane - a[:, 2]) / (c[:, 2] - a[:, 2]))[:, None]
+        # a lone corner in front leaves a smaller triangle, while a lone corner behind leaves a quadrilateral split in two
+        triangles = np.concatenate((points[whole], np.stack((a, ab, ac), axis=1)[one],
+                                    np.stack((ab, b, c), axis=1)[~one], np.stack((ab, c, ac), axis=1)[~one]))
+        source = np.concatenate((whole, crossing[one], crossing[~one], crossing[~one]))
+        return triangles, source
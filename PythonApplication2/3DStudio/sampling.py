@@ -0,0 +1,107 @@
+# import necessary libraries
+import numpy as np
+from utilities import *
+
+# random numbers for the static renderer, drawn from sources that depend only on the render seed and where they are used
+# so an image is identical however the tiles are shared between worker processes
+# every path uses one vector for its camera ray jitter and one for each bounce, each with components between 0 and 1 (or -1 and 1 from vector)
+# two samplers are available:
+# "random" draws independent random numbers from a stream for each tile of each pass
+# "halton" draws each pixel's samples from a scrambled Halton sequence, which covers every dimension evenly and so converges in fewer passes
+
+# class handing out random vectors from an independent stream, generated a block at a time
+class RandomStream:
+    def __init__(self, seed, key, blockSize=1024):
+        # the seed sequence mixes the seed with the key, so streams of neighbouring keys are unrelated
+        self.rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=key))
+        self.blockSize = blockSize
+        self.vectors = iter(())
+
+    def refill(self): # generates the next block of vectors
+        # drawing blocks one after another gives the same numbers as drawing them all at once, so the block size never changes an image
+        xs, ys, zs = (self.rng.random((self.blockSize, 3)) * 2 - 1).T.tolist()
+        self.vectors = iter(list(map(Vect, xs, ys, zs)))
+
+    def vector(self): # returns a vector with each component uniformly random between -1 and 1
+        try:
+            return next(self.vectors)
+        except StopIteration:
+            self.refill()
+            return next(self.vectors)
+
+    def path(self, i, j, sample): # returns the source of vectors for one path, which for a stream is the stream itself
+        return self
+
+    def uniform(self, paths, dimension): # returns an (N, 3) array of random numbers between 0 and 1, one row for each given path
+        return self.rng.random((len(paths), 3))
+
+# class handing out the samples of a tile from a Halton sequence, scrambled so neighbouring pixels and dimensions are unrelated
+class HaltonSampler:
+    def __init__(self, seed, frame, x0, y0, tileWidth, tileHeight, samples, vectorsPerPath):
+        self.samples = samples
+        self.tileWidth = tileWidth
+        dimensions = vectorsPerPath * 3
+        # the nth sample of every pixel is the nth point of the sequence, continuing from the samples taken in earlier passes
+        indices = np.arange(frame, frame + samples)
+        # permuting the digits of each dimension breaks up the correlation between dimensions with large bases
+        rng = np.random.default_rng(np.random.SeedSequence(seed))
+        points = np.stack([radicalInverse(indices, base, digitPermutation(base, rng)) for base in firstPrimes(dimensions)], axis=1)
+        # shifting every point of a pixel by the same random offset keeps the sequence even within the pixel while making neighbouring pixels unrelated
+        ys, xs = np.mgrid[y0:y0 + tileHeight, x0:x0 + tileWidth]
+        shifts = pixelShifts(seed, xs.ravel(), ys.ravel(), dimensions)
+        values = (shifts[:, None, :] + points[None, :, :]) % 1.0
+        # paths are ordered by row, then column, then sample
+        self.table = values.reshape(-1, vectorsPerPath, 3)
+        self.vectors = None
+
+    def path(self, i, j, sample): # starts handing out the vectors of one path, given by its position in the tile and sample number
+        xs, ys, zs = (self.table[(j * self.tileWidth + i) * self.samples + sample] * 2 - 1).T.tolist()
+        self.vectors = map(Vect, xs, ys, zs)
+        return self
+
+    def vector(self): # returns the next vector of the current path, with components between -1 and 1
+        return next(self.vectors)
+
+    def uniform(self, paths, dimension): # returns an (N, 3) array of the given paths' values for one vector, between 0 and 1
+        return self.table[paths, dimension]
+
+def firstPrimes(count): # returns a list of the first count prime numbers
+    primes = []
+    candidate = 2
+    while len(primes) < count:
+        if all(candidate % p != 0 for p in primes):
+            primes.append(candidate)
+        candidate += 1
+    return primes
+
+def digitPermutation(base, rng): # returns a random permutation of the digits of a base that keeps 0 in place, so trailing zeros add nothing
+    return np.concatenate(([0], rng.permutation(np.arange(1, base))))
+
+def radicalInverse(indices, base, permutation): # reflects the permuted digits of each index about the radix point
+    result = np.zeros(len(indices))
+    indices = indices.copy()
+    scale = 1 / base
+    while indices.any():
+        result += permutation[indices % base] * scale
+        indices //= base
+        scale /= base
+    return result
+
+def pixelShifts(seed, xs, ys, dimensions): # returns an offset between 0 and 1 for each pixel and dimension
+    # hashing the pixel position rather than drawing from a stream makes a pixel's offsets the same whatever tile it falls in
+    values = mix(np.full(len(xs), seed, dtype=np.uint64) + np.uint64(0x9E3779B97F4A7C15))
+    values = mix(values ^ np.asarray(xs, dtype=np.uint64))
+    values = mix(values ^ np.asarray(ys, dtype=np.uint64))
+    values = mix(values[:, None] ^ np.arange(dimensions, dtype=np.uint64)[None, :])
+    # the top 53 bits give every double between 0 and 1 that is a multiple of 2^-53
+    return (values >> np.uint64(11)).astype(np.float64) / 2.0 ** 53
+
+def mix(values): # scrambles the bits of an array of 64 bit integers (the splitmix64 finaliser)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+def tileSampler(sampler, seed, frame, x0, y0, tileWidth, tileHeight, samples, maxBounces): # returns the sampler for one tile of the pass starting at the given sample
+    if sampler == "halton":
+        return HaltonSampler(seed, frame, x0, y0, tileWidth, tileHeight, samples, maxBounces + 1)
+    return RandomStream(seed, (frame, x0, y0))
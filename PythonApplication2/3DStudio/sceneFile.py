@@ -0,0 +1,201 @@
+# import necessary libraries
+import contextlib
+import gc
+import os
+import pickle
+import struct
+import sys
+import numpy as np
+from realtimeRenderer import Triangle, Sphere
+from utilities import *
+
+# binary scene files saved by the editor, replacing pickled lists of shapes
+# layout: a 48 byte header followed by typed arrays, each stored whole so they can be memory mapped
+# header: magic, format version, padding, shape count, vertex count, triangle count, sphere count
+# arrays, in order: shape kinds (uint8, 0 for triangles and 1 for spheres, in the order the shapes were added),
+# vertices (float64, V x 3), triangle colours (float64, T x 3), triangle materials (float64, T x 2 of shine and emission),
+# sphere centres (float64, S x 3), sphere radii (float64, S), sphere colours (float64, S x 3), sphere materials (float64, S x 2)
+# and faces (uint32, T x 3 indices into vertices)
+sceneMagic = b"3DSSCENE"
+sceneVersion = 1
+headerFormat = "<8sIIQQQQ"
+headerSize = struct.calcsize(headerFormat)
+floatType = np.dtype("<f8")
+faceType = np.dtype("<u4")
+kindType = np.dtype("u1")
+
+# class holding the shapes of a scene as arrays, as they are stored in a scene file
+class SceneData:
+    def __init__(self, kinds, vertices, faces, triangleColours, triangleMaterials, sphereCentres, sphereRadii, sphereColours, sphereMaterials):
+        self.kinds = kinds
+        self.vertices = vertices
+        self.faces = faces
+        self.triangleColours = triangleColours
+        self.triangleMaterials = triangleMaterials
+        self.sphereCentres = sphereCentres
+        self.sphereRadii = sphereRadii
+        self.sphereColours = sphereColours
+        self.sphereMaterials = sphereMaterials
+
+    def arrays(self): # returns the arrays in the order they are stored, with the type and shape of each
+        return [(self.kinds, kindType, (-1,)),
+                (self.vertices, floatType, (-1, 3)),
+                (self.triangleColours, floatType, (-1, 3)),
+                (self.triangleMaterials, floatType, (-1, 2)),
+                (self.sphereCentres, floatType, (-1, 3)),
+                (self.sphereRadii, floatType, (-1,)),
+                (self.sphereColours, floatType, (-1, 3)),
+                (self.sphereMaterials, floatType, (-1, 2)),
+                (self.faces, faceType, (-1, 3))]
+
+    @staticmethod
+    def fromShapes(shapes): # packs a list of realtime renderer shapes into arrays
+        triangles = [s for s in shapes if type(s) == Triangle]
+        spheres = [s for s in shapes if type(s) == Sphere]
+        kinds = np.array([type(s) == Sphere for s in shapes], dtype=kindType)
+        with pausedCollection():
+            corners = np.array([(p.x, p.y, p.z) for t in triangles for p in (t.p1, t.p2, t.p3)], dtype=np.float64).reshape(-1, 3)
+        # corners at the same position are stored once
+        vertices, faces = uniqueRows(corners)
+        return SceneData(kinds, vertices, faces.reshape(-1, 3),
+                         np.array([t.colour for t in triangles], dtype=np.float64).reshape(-1, 3),
+                         np.array([t.rtArgs[1:3] for t in triangles], dtype=np.float64).reshape(-1, 2),
+                         np.array([(s.centre.x, s.centre.y, s.centre.z) for s in spheres], dtype=np.float64).reshape(-1, 3),
+                         np.array([s.radius for s in spheres], dtype=np.float64),
+                         np.array([s.colour for s in spheres], dtype=np.float64).reshape(-1, 3),
+                         np.array([s.rtArgs[1:3] for s in spheres], dtype=np.float64).reshape(-1, 2))
+
+    def toShapes(self): # creates the realtime renderer shapes, in the order they were saved
+        with pausedCollection():
+            corners = iter([Vect(x, y, z) for x, y, z in self.vertices[self.faces.reshape(-1)].tolist()])
+            triangles = iter([Triangle(next(corners), next(corners), next(corners), tuple(colour), ["Triangle", shine, emission])
+                              for colour, (shine, emission) in zip(self.triangleColours.tolist(), self.triangleMaterials.tolist())])
+            spheres = iter([Sphere(Vect(*centre), radius, tuple(colour), ["Sphere", shine, emission])
+                            for centre, radius, colour, (shine, emission) in zip(self.sphereCentres.tolist(), self.sphereRadii.tolist(),
+                                                                                 self.sphereColours.tolist(), self.sphereMaterials.tolist())])
+            return [next(spheres) if kind else next(triangles) for kind in self.kinds.tolist()]
+
+@contextlib.contextmanager
+def pausedCollection(): # pauses garbage collection while creating many objects that hold no reference cycles
+    # otherwise the collector repeatedly scans every object created so far, tripling the time taken
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def uniqueRows(points): # returns the distinct rows of an (N, 3) array and the index of each row among them
+    # sorting by column is much faster than sorting whole rows, and comparing the bits keeps -0.0 and 0.0 apart so saving is lossless
+    order = np.lexsort((points[:, 2], points[:, 1], points[:, 0]))
+    bits = points[order].view(np.int64)
+    first = np.ones(len(points), dtype=bool)
+    first[1:] = (bits[1:] != bits[:-1]).any(axis=1)
+    inverse = np.empty(len(points), dtype=np.int64)
+    inverse[order] = np.cumsum(first) - 1
+    return (points[order[first]], inverse)
+
+def writeScene(path, scene): # writes scene arrays to a scene file
+    # write to a temporary file first so a partially written scene never replaces a good one
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(struct.pack(headerFormat, sceneMagic, sceneVersion, 0, len(scene.kinds), len(scene.vertices), len(scene.faces), len(scene.sphereRadii)))
+        for array, dtype, _ in scene.arrays():
+            file.write(np.ascontiguousarray(array, dtype=dtype).tobytes())
+    os.replace(temporary, path)
+
+def readScene(path): # memory maps the arrays of a scene file
+    with open(path, "rb") as file:
+        header = file.read(headerSize)
+    if len(header) != headerSize:
+        raise ValueError("scene file is too short")
+    magic, version, _, shapeCount, vertexCount, triangleCount, sphereCount = struct.unpack(headerFormat, header)
+    if magic != sceneMagic:
+        raise ValueError("not a scene file")
+    if version != sceneVersion:
+        raise ValueError(f"unsupported scene file version {version}")
+    counts = [shapeCount, vertexCount, triangleCount, triangleCount, sphereCount, sphereCount, sphereCount, sphereCount, triangleCount]
+    empty = SceneData(*[None] * 9)
+    sizes = [count * dtype.itemsize * int(np.prod(shape[1:])) for count, (_, dtype, shape) in zip(counts, empty.arrays())]
+    if os.path.getsize(path) != headerSize + sum(sizes):
+        raise ValueError("scene file is truncated or corrupt")
+
+    arrays = []
+    offset = headerSize
+    for count, size, (_, dtype, shape) in zip(counts, sizes, empty.arrays()):
+        shape = (count,) + shape[1:]
+        arrays.append(np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape) if count else np.zeros(shape, dtype=dtype))
+        offset += size
+    kinds, vertices, triangleColours, triangleMaterials, sphereCentres, sphereRadii, sphereColours, sphereMaterials, faces = arrays
+    if len(faces) and int(faces.max()) >= vertexCount:
+        raise ValueError("scene file face refers to a vertex that does not exist")
+    if int(kinds.sum()) != sphereCount:
+        raise ValueError("scene file shape kinds do not match its sphere count")
+    return SceneData(kinds, vertices, faces, triangleColours, triangleMaterials, sphereCentres, sphereRadii, sphereColours, sphereMaterials)
+
+def isSceneFile(path): # checks whether a file starts with the scene file magic
+    with open(path, "rb") as file:
+        return file.read(len(sceneMagic)) == sceneMagic
+
+# class standing in for every class found in a legacy pickle, so loading one never runs code from the file
+class LegacyObject:
+    def __setstate__(self, state):
+        # vectors saved with slots store their state as a (dictionary, slots) pair
+        if type(state) == tuple:
+            state = {**(state[0] or {}), **(state[1] or {})}
+        self.__dict__.update(state)
+
+# unpickler that only accepts the shape and vector classes saved by earlier versions of the editor
+class LegacyUnpickler(pickle.Unpickler):
+    allowed = {("realtimeRenderer", "Triangle"), ("realtimeRenderer", "Sphere"), ("utilities", "Vect")}
+
+    def find_class(self, module, name):
+        # pickles saved with protocols 0 and 1 create objects through copyreg, which is replaced with a safe equivalent
+        if module in ("copyreg", "copy_reg") and name == "_reconstructor":
+            return lambda cls, base, state: cls()
+        if module in ("builtins", "__builtin__") and name == "object":
+            return object
+        if (module, name) not in self.allowed:
+            raise pickle.UnpicklingError(f"{module}.{name} is not allowed in a scene file")
+        return LegacyObject
+
+def shapeFromLegacy(legacy): # creates a realtime renderer shape from an object in a legacy pickle
+    fields = legacy.__dict__
+    vect = lambda v: Vect(v.x, v.y, v.z)
+    if "p1" in fields:
+        return Triangle(vect(fields["p1"]), vect(fields["p2"]), vect(fields["p3"]), fields["colour"], fields["rtArgs"])
+    if "x1" in fields:
+        # the first version of the editor stored each corner of a triangle as separate attributes
+        return Triangle(Vect(fields["x1"], fields["y1"], fields["z1"]), Vect(fields["x2"], fields["y2"], fields["z2"]),
+                        Vect(fields["x3"], fields["y3"], fields["z3"]), fields["colour"], fields["rtArgs"])
+    if "centre" in fields:
+        return Sphere(vect(fields["centre"]), fields["radius"], fields["colour"], fields["rtArgs"])
+    if "x" in fields and "radius" in fields:
+        return Sphere(Vect(fields["x"], fields["y"], fields["z"]), fields["radius"], fields["colour"], fields["rtArgs"])
+    raise ValueError("unrecognised shape in legacy scene file")
+
+def readLegacy(path): # reads the shapes of a pickled scene saved by an earlier version of the editor
+    with open(path, "rb") as file:
+        shapes = LegacyUnpickler(file).load()
+    if type(shapes) != list:
+        raise ValueError("legacy scene file does not hold a list of shapes")
+    return [shapeFromLegacy(shape) for shape in unnest(shapes)]
+
+def saveScene(path, shapes): # saves a list of realtime renderer shapes to a scene file
+    writeScene(path, SceneData.fromShapes(shapes))
+
+def loadScene(path): # returns the list of realtime renderer shapes in a scene file, converting legacy pickled scenes
+    if isSceneFile(path):
+        return readScene(path).toShapes()
+    return readLegacy(path)
+
+def convertLegacy(source, destination): # converts a legacy pickled scene to a scene file
+    saveScene(destination, readLegacy(source))
+
+if __name__ == "__main__":
+    # example: python sceneFile.py savedata.txt savedata.txt
+    if len(sys.argv) != 3:
+        print("usage: python sceneFile.py <legacy scene> <new scene>")
+        sys.exit(1)
+    convertLegacy(sys.argv[1], sys.argv[2])
@@ -0,0 +1,103 @@
+# import necessary libraries
+from collections import deque
+
+# the editor's scene and its undo history
+# shapes are added in groups kept by id, such as an imported mesh or a single shape, so adding or removing a group never touches the rest of the scene
+# every change is a command that knows how to undo itself, so an imported mesh is undone in one step
+
+# class holding the groups of shapes in a scene keyed by id, in the order they were added
+# a group is any object with a list of shapes and a length, such as a realtime renderer shape group
+class Scene:
+    def __init__(self):
+        self.items = {} # group of each id, in insertion order
+        self.nextId = 0
+        self.shapeCount = 0
+        self.cachedGroups = [] # list of every group, rebuilt when first needed after a change
+        self.cachedShapes = [] # list of every shape, rebuilt when first needed after a change
+
+    def __len__(self): # returns the number of shapes in the scene
+        return self.shapeCount
+
+    def add(self, group, groupId=None): # adds a group of shapes to the scene, returning its id
+        if groupId is None:
+            groupId = self.nextId
+            self.nextId += 1
+        self.items[groupId] = group
+        self.shapeCount += len(group)
+        self.changed()
+        return groupId
+
+    def remove(self, groupId): # removes a group of shapes from the scene by id, returning it
+        group = self.items.pop(groupId)
+        self.shapeCount -= len(group)
+        self.changed()
+        return group
+
+    def changed(self): # discards the lists built from the scene before it changed
+        self.cachedGroups = None
+        self.cachedShapes = None
+
+    def groups(self): # returns a list of every group in the scene
+        # the list only holds one entry per group, and a new list tells the renderer the scene has changed
+        if self.cachedGroups is None:
+            self.cachedGroups = list(self.items.values())
+        return self.cachedGroups
+
+    def shapes(self): # returns a list of every shape in the scene, for saving and static rendering
+        if self.cachedShapes is None:
+            self.cachedShapes = [shape for group in self.items.values() for shape in group.shapes]
+        return self.cachedShapes
+
+# class for the command that adds a group of shapes to the scene, undone by removing the same group
+class AddShapes:
+    def __init__(self, group):
+        self.group = group
+        self.groupId = None
+
+    def __len__(self): # returns the number of shapes the command holds
+        return len(self.group)
+
+    def do(self, scene):
+        # redoing the command gives the group back its original id, along with any levels of detail built for it
+        self.groupId = scene.add(self.group, self.groupId)
+
+    def undo(self, scene):
+        scene.remove(self.groupId)
+
+# class keeping the undo and redo stacks of commands applied to a scene
+class History:
+    def __init__(self, scene, maxCommands=100, maxShapes=2000000):
+        self.scene = scene
+        self.maxCommands = maxCommands # bound on the number of commands remembered
+        self.maxShapes = maxShapes # bound on the total number of shapes held by remembered commands
+        self.undoStack = deque()
+        self.redoStack = deque()
+        self.shapeCount = 0
+
+    def execute(self, command): # applies a new command, which clears anything that could be redone
+        command.do(self.scene)
+        self.shapeCount -= sum(map(len, self.redoStack))
+        self.redoStack.clear()
+        self.undoStack.append(command)
+        self.shapeCount += len(command)
+        self.trim()
+
+    def undo(self): # undoes the last command, returning whether there was one
+        if not self.undoStack:
+            return False
+        command = self.undoStack.pop()
+        command.undo(self.scene)
+        self.redoStack.append(command)
+        return True
+
+    def redo(self): # redoes the last undone command, returning whether there was one
+        if not self.redoStack:
+            return False
+        command = self.redoStack.pop()
+        command.do(self.scene)
+        self.undoStack.append(command)
+        return True
+
+    def trim(self): # forgets the oldest commands until the history is within its bounds, always keeping the latest one
+        while len(self.undoStack) > 1 and (len(self.undoStack) > self.maxCommands or self.shapeCount > self.maxShapes):
+            self.shapeCount -= len(self.undoStack.popleft())
@@ -1,9 +1,15 @@
 from multiprocessing import Pool
+import os
 import sys
 import numpy as np
 import time
 import pygame
 from utilities import *
+from bvh import BVH
+from compiledScene import CompiledScene
+import wavefrontIntegrator
+from sampling import tileSampler
+from profiler import profiler
     
 class Sphere: # class representing a sphere object
     def __init__(self, centre, radius, colour, shine, emission):
@@ -106,20 +112,70 @@ class Ray: # class representing a ray, with origin and direction
             # if intersection is behind the ray origin, return no hit
             return HitInfo(False, None, None, None, None, None, None)
     
+# scene data held by each worker process, received once when the worker pool starts
+workerState = {}
+
+def initWorker(scene, maxBounces, width, height, skyTint, skyLight, integrator, sampler): # stores the scene in a worker process when it starts
+    workerState["args"] = (scene, maxBounces, width, height, skyTint, skyLight)
+    workerState["integrator"] = integrator
+    workerState["sampler"] = sampler
+
+def shadeTile(task): # shades a tile of pixels in a worker process using the scene it received at startup
+    x0, y0, tileWidth, tileHeight, samples, seed, frame = task
+    start = time.perf_counter()
+    scene, maxBounces, width, height, skyTint, skyLight = workerState["args"]
+    # the tile's random numbers depend only on the seed, the pass and the tile's position, so each tile is reproducible
+    sampler = tileSampler(workerState["sampler"], seed, frame, x0, y0, tileWidth, tileHeight, samples, maxBounces)
+    if workerState["integrator"] == "wavefront":
+        # trace all paths of the tile together as arrays
+        block = wavefrontIntegrator.shadeTile(scene, x0, y0, tileWidth, tileHeight, samples, maxBounces, width, height,
+                                              skyTint, skyLight, sampler)
+        return (x0, y0, block, (start, time.perf_counter(), os.getpid()))
+    # sum every sample of every pixel locally, returning the tile as one block
+    block = np.zeros((tileHeight, tileWidth, 3), dtype=np.float32)
+    for j in range(tileHeight):
+        for i in range(tileWidth):
+            total = Vect(0, 0, 0)
+            for sample in range(samples):
+                total += StaticRenderer.pixelShader((scene, x0 + i, y0 + j, maxBounces, width, height, skyTint, skyLight, sampler.path(i, j, sample)))
+            block[j, i] = total.returnArray()
+    # return when the tile was shaded along with the tile, so the main process can trace time spent in each worker
+    return (x0, y0, block, (start, time.perf_counter(), os.getpid()))
+
 class StaticRenderer:
-    def __init__(self, width, height, camPos, screen, meshIn, skyTint, skyLight):
+    def __init__(self, width, height, camPos, screen, meshIn, skyTint, skyLight, tileSize=16, samplesPerTask=1, integrator="path", sceneDtype=np.float64,
+                 maxBounces=5, workers=None, seed=0, sampler="random"):
+        # every random stream is seeded from this value, and numpy only accepts seeds that fit in 64 bits without a sign
+        if not 0 <= seed < 2 ** 64:
+            raise ValueError("seed must be between 0 and 2^64 - 1")
         self.width = width
         self.height = height
+        self.maxBounces = maxBounces # maximum number of times each ray bounces around the scene
+        self.workers = workers # number of worker processes (None uses every available core)
+        self.seed = seed # base seed that every sample's random numbers are derived from
+        self.tileSize = tileSize # width and height of the square tiles handed to each worker
+        self.samplesPerTask = samplesPerTask # samples each worker takes per pixel before returning a tile
+        self.integrator = integrator # "path" shades one path at a time with pixelShader, "wavefront" traces a whole tile at once
+        self.sampler = sampler # "random" for independent random samples, "halton" for a scrambled low-discrepancy sequence that converges faster
+        self.sceneDtype = sceneDtype # precision of the compiled scene arrays (np.float32 halves their memory)
         self.camPos = Vect(camPos[0], camPos[1], camPos[2]) # camera position as a vector
         self.objects = [] # stores scene objects
-        # create buffer to store accumulated frames for averaging
-        self.accumulationBuffer =  np.full((width, height), Vect(0, 0, 0), dtype=object)
-        self.frames = 1
-        # final image buffer
-        self.surface = np.zeros((width, height, 3), dtype=np.uint8)
-        self.screen = screen # pygame display surface
+        # create buffer to store accumulated frames for averaging, indexed by row then column
+        self.accumulationBuffer = np.zeros((height, width, 3), dtype=np.float64)
+        self.frames = 0 # number of samples accumulated per pixel
+        self.frameTimes = [] # seconds taken by each pass of the render loop, for performance testing
+        # final image buffer, along with a scratch buffer reused when converting the accumulated colours
+        self.surface = np.zeros((height, width, 3), dtype=np.uint8)
+        self.scratchBuffer = np.zeros((height, width, 3), dtype=np.float64)
+        self.screen = screen # pygame display surface (None when rendering without a display)
+        # pygame surfaces holding the image at render resolution and at screen resolution, updated in place
+        self.pySurface = pygame.Surface((width, height))
+        self.scaledSurface = None
         self.skyTint = skyTint
         self.skyLight = skyLight
+        self.scene = None # scene objects packed into arrays, compiled when rendering starts
+        self.bvh = None # bounding volume hierarchy over the compiled scene
+        self.pool = None # worker processes, kept alive for the whole render
         # defines values for converting between coordinate systems
         coordRatio = 0.25
         zOffset = -50
@@ -140,6 +196,16 @@ class StaticRenderer:
         # initialised closest hit of no intersection and infinite distance
         closestHit = HitInfo(None, float("inf"), None, None, Vect(0,0,0), Vect(0,0,0), 0)
 
+        # if the scene has been compiled into a bounding volume hierarchy, traverse it instead of testing every object
+        if type(objects) == BVH:
+            dist, primitive = objects.findRayHit(ray)
+            if primitive == -1:
+                return closestHit
+            # compute the intersection point and look up the surface details of the primitive hit
+            hitPoint = ray.origin + (ray.direction * dist)
+            normal, colour, shine, emission = objects.scene.surface(primitive, hitPoint)
+            return HitInfo(True, dist, hitPoint, normal, colour, shine, emission)
+
         # interate through objects, checking for intersection with each
         for obj in objects:
             if type(obj) == Sphere:
@@ -155,7 +221,7 @@ class StaticRenderer:
 
     @staticmethod
     def pixelShader(args):
-        objects, x, y, maxBounces, width, height, skyTint, skyLight = args
+        objects, x, y, maxBounces, width, height, skyTint, skyLight, sampler = args
         # convert pixel coordinates to normalised coordinates for direction vector of rays
         coord = Vect(x, height - y, 1.0)
         coord /= Vect(width, height, 1.0)
@@ -166,7 +232,7 @@ class StaticRenderer:
         coord.x *= aspectRatio
         # add a small amount of random blur for anti-aliasing
         blur = 0.002
-        coord += randomVector() * blur
+        coord += sampler.vector() * blur
 
         # initiailse ray
         ray = Ray(Vect(0, 0, 0), coord.normalise())
@@ -188,7 +254,7 @@ class StaticRenderer:
                 # compute perfect reflection for specular reflection
                 reflect = (ray.direction - (hitInfo.normal * 2 * (ray.direction.dot(hitInfo.normal)))).normalise()
                 # compute random scattering for diffuse reflection
-                scatter = (randomVector() + hitInfo.normal).normalise()
+                scatter = (sampler.vector() + hitInfo.normal).normalise()
                 # calculate wieghted average of specular and diffuse reflection based on object's shine property
                 bounce = ((reflect.normalise() * hitInfo.shine) + (scatter.normalise() * (Vect(1,1,1) - hitInfo.shine)))/2
 
@@ -207,64 +273,116 @@ class StaticRenderer:
         # return gathered colour from traversal of the scene
         return light * 1.5
     
-    def parallelShading(self): # speeds up calculation process by implementing parallel computation
-        # create a list of tasks to complete (one for each pixel)
-        coords = [(self.objects, index % self.width, index // self.width, 5, self.width, self.height, self.skyTint, self.skyLight)
-                  for index in range(self.width * self.height)]
-        # execute in parallel, mapping pixelShader to all tasks
-        with Pool() as pool:
-            colours = pool.map(StaticRenderer.pixelShader, coords)
-        
-        # accumulate the colour values in accumulation buffer
-        for coord, colour in zip(coords, colours):
-            x, y = coord[1], coord[2]
-            self.accumulationBuffer[x, y] += colour
+    def compileScene(self): # packs the scene objects into contiguous arrays and builds the bounding volume hierarchy over them
+        triangles = [(index, obj) for index, obj in enumerate(self.objects) if type(obj) == Triangle]
+        spheres = [(index, obj) for index, obj in enumerate(self.objects) if type(obj) == Sphere]
+        self.scene = CompiledScene([[t.p1.returnArray(), t.p2.returnArray(), t.p3.returnArray()] for _, t in triangles],
+                                   [t.colour.returnArray() for _, t in triangles], [t.shine for _, t in triangles],
+                                   [t.emission for _, t in triangles], [index for index, _ in triangles],
+                                   [s.centre.returnArray() for _, s in spheres], [s.radius for _, s in spheres],
+                                   [s.colour.returnArray() for _, s in spheres], [s.shine for _, s in spheres],
+                                   [s.emission for _, s in spheres], [index for index, _ in spheres], self.sceneDtype)
+        self.bvh = BVH(self.scene)
+
+    def startPool(self): # starts the worker processes, sending the scene to each of them once
+        if self.bvh is None:
+            self.compileScene()
+        self.pool = Pool(processes=self.workers, initializer=initWorker,
+                         initargs=(self.bvh, self.maxBounces, self.width, self.height, self.skyTint, self.skyLight, self.integrator, self.sampler))
+
+    def stopPool(self): # shuts down the worker processes
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def getTiles(self): # splits the image into tiles, ordered along a z-order curve so neighbouring tiles are shaded together
+        tiles = []
+        for tileY in range(0, self.height, self.tileSize):
+            for tileX in range(0, self.width, self.tileSize):
+                tiles.append((tileX, tileY, min(self.tileSize, self.width - tileX), min(self.tileSize, self.height - tileY)))
+        tiles.sort(key=lambda tile: mortonCode(tile[0] // self.tileSize, tile[1] // self.tileSize))
+        return tiles
+
+    def parallelShading(self, samples=None): # speeds up calculation process by implementing parallel computation
+        if self.pool is None:
+            self.startPool()
+        # number of samples per pixel taken in this pass
+        samples = self.samplesPerTask if samples is None else samples
+        # create a list of tasks to complete (one for each tile), each carrying only its position, sample count and what its random numbers derive from
+        with profiler.span("tasks"):
+            tasks = [(x, y, tileWidth, tileHeight, samples, self.seed, self.frames) for x, y, tileWidth, tileHeight in self.getTiles()]
+        # execute in parallel, accumulating each tile as soon as a worker returns it
+        # shading time is summed over every worker, so it exceeds the dispatch time when several workers run at once
+        with profiler.span("dispatch"):
+            for x, y, block, (start, end, process) in self.pool.imap_unordered(shadeTile, tasks):
+                profiler.record("shading", start, end, process)
+                with profiler.span("accumulation"):
+                    self.accumulationBuffer[y:y + block.shape[0], x:x + block.shape[1]] += block
+        self.frames += samples
         
     def show(self): # renders accumulated image to the screen
-        # create generator to iterate through each pixels coordinates
-        generator = ((index % self.width, index // self.width) for index in range(self.width * self.height))
-        
-        # loop through every pixel
-        for x, y in generator:
-            # yield colour and adjust for current number of calculated frames
-            colour = (self.accumulationBuffer[x, y] * 255)
-            colour /= float(self.frames)
-            colour = colour.roundTuple()
-            # clamp colour values to acceptable range
-            colour = tuple(min(255, max(0, c)) for c in colour)
-            
-            # assign the computed colour to the corresponding pixel in the surface
-            self.surface[x, y] = colour
+        # average the accumulated colour over the number of samples and scale to the 0-255 range
+        np.multiply(self.accumulationBuffer, 255 / float(max(self.frames, 1)), out=self.scratchBuffer)
+        # round and clamp colour values to acceptable range, then convert to bytes
+        np.rint(self.scratchBuffer, out=self.scratchBuffer)
+        np.clip(self.scratchBuffer, 0, 255, out=self.scratchBuffer)
+        np.copyto(self.surface, self.scratchBuffer, casting="unsafe")
 
-        # create pygame surface and draw to screen
-        pySurface = pygame.surfarray.make_surface(self.surface)
-        scaledSurface = pygame.transform.scale(pySurface, self.screen.get_size())
-        self.screen.blit(scaledSurface, (0, 0))
+        # copy the image into the pygame surface and draw to screen
+        pygame.surfarray.blit_array(self.pySurface, self.surface.swapaxes(0, 1))
+        if self.screen is None:
+            return
+        if self.scaledSurface is None:
+            self.scaledSurface = pygame.Surface(self.screen.get_size(), 0, self.pySurface)
+        pygame.transform.scale(self.pySurface, self.screen.get_size(), self.scaledSurface)
+        self.screen.blit(self.scaledSurface, (0, 0))
         pygame.display.flip()
                 
-    def render(self): # handles the rendering process of the scene in a loop
+    def render(self, targetSamples=None, timeBudget=None, output="image.png"): # handles the rendering process of the scene in a loop
         # add a large sphere object to act as the ground
         self.objects.append(Sphere(Vect(0, -10000, -5), 9995, Vect(100,100,100) / 255, 0.5, 0))
+        # compile the scene and build the bounding volume hierarchy once so each ray only tests nearby objects
+        with profiler.span("compile"):
+            self.compileScene()
+
+        # start the worker processes once for the whole render
+        with profiler.span("start workers"):
+            self.startPool()
+        profiler.frame()
 
         running = True
-        totalTime = 0
-        # main rendering loop, runs until the user closes the window
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
+        renderStart = time.time()
+        # main rendering loop, runs until the user closes the window or the sample or time budget is reached
+        try:
+            while running:
+                if self.screen is not None:
+                    for event in pygame.event.get():
+                        if event.type == pygame.QUIT:
+                            running = False
+                start = time.time()
+                # call parallelShading to run the necessary pixel calculations in parallel, without overshooting the sample target
+                with profiler.span("pass"):
+                    if targetSamples is None:
+                        self.parallelShading()
+                    else:
+                        self.parallelShading(min(self.samplesPerTask, targetSamples - self.frames))
+                # draw accumulated image to the screen
+                with profiler.span("show"):
+                    self.show()
+                profiler.frame()
+                end = time.time()
+                # record frame time for debugging and performance testing
+                self.frameTimes.append(end - start)
+                if targetSamples is not None and self.frames >= targetSamples:
+                    running = False
+                if timeBudget is not None and end - renderStart >= timeBudget:
                     running = False
-            start = time.time()
-            # call parallelShading to run the necessary pixel calculations in parallel
-            self.parallelShading()
-            # draw accumulated image to the screen
-            self.show()
-            end = time.time()
-            # calculate frame time for debugging and performance testing
-            frameTime = end - start
-            self.frames += 1
+        finally:
+            self.stopPool()
         
-        pySurface = pygame.surfarray.make_surface(self.surface)
         # save the output image to the directory to be opened later
-        pygame.image.save(pySurface, "image.png")
+        pygame.image.save(self.pySurface, output)
 
-        pygame.quit()
\ No newline at end of file
+        if self.screen is not None:
+            pygame.quit()
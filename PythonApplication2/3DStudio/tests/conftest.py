@@ -0,0 +1,18 @@
+# import necessary libraries
+import os
+import sys
+import numpy as np
+import pytest
+
+# the studio's modules are imported by name, as they are when running from the 3DStudio folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def randomRays(): # returns a function building rays shared by the kernel and BVH tests
+    def build(rng, count): # returns origins and unit directions of rays from around the origin, half heading towards the shapes so some hit and some miss
+        origins = rng.uniform(-1, 1, (count, 3))
+        directions = rng.normal(size=(count, 3))
+        directions[: count // 2, 2] = 0 - np.abs(directions[: count // 2, 2]) - 2
+        directions /= np.sqrt((directions ** 2).sum(axis=1))[:, None]
+        return (origins, directions)
+    return build
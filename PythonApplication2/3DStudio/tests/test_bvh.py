@@ -0,0 +1,71 @@
+# import necessary libraries
+import numpy as np
+import pytest
+from staticRenderer import StaticRenderer, Ray, Sphere, Triangle
+from bvh import BVH
+from utilities import *
+
+# the bounding volume hierarchy must find the same closest hit as testing every object in turn
+
+def randomObjects(rng, triangleCount, sphereCount): # returns a shuffled list of random triangles and spheres in front of the origin
+    objects = []
+    for _ in range(triangleCount):
+        p1 = rng.uniform(-8, 8, 3) + [0, 0, -15]
+        objects.append(Triangle(Vect(*p1), Vect(*(p1 + rng.uniform(-3, 3, 3))), Vect(*(p1 + rng.uniform(-3, 3, 3))),
+                                Vect(*rng.random(3)), rng.random(), 0))
+    for _ in range(sphereCount):
+        objects.append(Sphere(Vect(*(rng.uniform(-8, 8, 3) + [0, 0, -15])), rng.uniform(0.2, 2), Vect(*rng.random(3)), rng.random(), 0))
+    # repeat a shape exactly, so rays hitting it tie and must keep the first, as the linear scan does
+    if objects:
+        objects.append(objects[0])
+    order = rng.permutation(len(objects))
+    return [objects[i] for i in order]
+
+def compile(objects): # returns the hierarchy built over a list of static renderer objects
+    renderer = StaticRenderer(4, 4, (0, 0, 0), None, [], (1, 1, 1.7), 0.8)
+    renderer.objects = objects
+    renderer.compileScene()
+    return renderer.bvh
+
+def linearHit(objects, ray): # returns the distance and position in the object list of the closest hit, testing every object
+    bestDist, bestIndex = float("inf"), -1
+    for index, obj in enumerate(objects):
+        hitInfo = ray.hitSphere(obj) if type(obj) == Sphere else ray.hitTriangle(obj)
+        if hitInfo.hit and hitInfo.dist < bestDist:
+            bestDist, bestIndex = hitInfo.dist, index
+    return (bestDist, bestIndex)
+
+@pytest.mark.parametrize("triangleCount, sphereCount", [(0, 0), (1, 0), (0, 1), (40, 0), (0, 40), (150, 50)])
+def testScalarMatchesLinearScan(randomRays, triangleCount, sphereCount):
+    rng = np.random.default_rng(triangleCount * 1000 + sphereCount)
+    objects = randomObjects(rng, triangleCount, sphereCount)
+    bvh = compile(objects)
+    origins, directions = randomRays(rng, 300)
+    for origin, direction in zip(origins.tolist(), directions.tolist()):
+        ray = Ray(Vect(*origin), Vect(*direction))
+        dist, primitive = bvh.findRayHit(ray)
+        expectedDist, expectedIndex = linearHit(objects, ray)
+        # the scalar traversal performs the same arithmetic as the linear scan, so results are identical
+        assert dist == expectedDist
+        assert (int(bvh.scene.order[primitive]) if primitive != -1 else -1) == expectedIndex
+        # StaticRenderer.findRayHit gives the same answer whether it is passed the list or the hierarchy
+        assert StaticRenderer.findRayHit(bvh, ray).dist == StaticRenderer.findRayHit(objects, ray).dist
+
+@pytest.mark.parametrize("triangleCount, sphereCount", [(0, 0), (1, 0), (0, 1), (150, 50)])
+def testBatchedMatchesLinearScan(randomRays, triangleCount, sphereCount):
+    rng = np.random.default_rng(triangleCount * 1000 + sphereCount + 1)
+    objects = randomObjects(rng, triangleCount, sphereCount)
+    bvh = compile(objects)
+    origins, directions = randomRays(rng, 300)
+    dist, normals, colours, shine, emission = bvh.findRayHits(origins, directions)
+    expected = [linearHit(objects, Ray(Vect(*o), Vect(*d))) for o, d in zip(origins.tolist(), directions.tolist())]
+    expectedDist = np.array([d for d, _ in expected])
+    # the batched traversal rounds differently in the last bits, so distances agree to within a few units of the last place
+    assert np.array_equal(np.isinf(dist), np.isinf(expectedDist))
+    hit = np.isfinite(expectedDist)
+    assert np.allclose(dist[hit], expectedDist[hit], rtol=1e-12, atol=0)
+    # the surface reported is that of the object the linear scan hit
+    expectedShine = np.array([objects[i].shine if i != -1 else 0 for _, i in expected])
+    assert np.array_equal(shine, expectedShine)
+    if triangleCount + sphereCount > 1:
+        assert hit.any() and (~hit).any()
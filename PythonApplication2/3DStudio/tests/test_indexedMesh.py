@@ -0,0 +1,36 @@
+# import necessary libraries
+import os
+import numpy as np
+import pytest
+from objParser import parseObj
+from indexedMesh import IndexedMesh, lodChain
+
+meshFolder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def loadMesh(name): # returns a bundled object file as an indexed mesh
+    vertices, faces = parseObj(os.path.join(meshFolder, name))
+    return IndexedMesh(vertices, faces, np.ones((len(faces), 3)), np.zeros(len(faces), dtype=bool))
+
+def bumpyGrid(scale, size=24, seed=0): # returns a nearly flat square grid with small random bumps, scaled by scale
+    rng = np.random.default_rng(seed)
+    ys, xs = np.mgrid[0:size, 0:size]
+    vertices = np.stack((xs.ravel(), ys.ravel(), rng.random(size * size) * 1e-3), axis=1).astype(np.float64) * scale
+    corners = (ys[:-1, :-1] * size + xs[:-1, :-1]).ravel()
+    faces = np.concatenate((np.stack((corners, corners + 1, corners + size + 1), axis=1),
+                            np.stack((corners, corners + size + 1, corners + size), axis=1)))
+    return IndexedMesh(vertices, faces, np.ones((len(faces), 3)), np.zeros(len(faces), dtype=bool))
+
+def assertInsideBounds(mesh): # checks every level of detail stays within the bounding box of the source mesh
+    low, high = mesh.vertices.min(axis=0), mesh.vertices.max(axis=0)
+    chain = lodChain(mesh)
+    assert len(chain) > 1
+    for level in chain:
+        assert (level.vertices >= low).all() and (level.vertices <= high).all()
+
+@pytest.mark.parametrize("name", ["Duck_01.obj", "cat.obj", "donut.obj"])
+def testLodInsideBounds(name): # simplified levels of the bundled meshes never grow past the full detail mesh
+    assertInsideBounds(loadMesh(name))
+
+@pytest.mark.parametrize("scale", [1e-3, 1, 1e3])
+def testNearlyFlatLodInsideBounds(scale): # nearly singular quadrics of a nearly flat mesh are handled the same at any scale
+    assertInsideBounds(bumpyGrid(scale))
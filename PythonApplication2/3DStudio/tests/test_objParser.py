@@ -0,0 +1,33 @@
+# import necessary libraries
+import numpy as np
+import pytest
+from objParser import parseObj, parseChunk
+
+commentedObj = b"""# exported with comments
+o cube # object name
+v 0 0 0 # first corner
+v 1 0 0
+v 1 1 0   #no space before this comment
+# v 9 9 9 is a commented out vertex
+v 0 1 0
+vt 0.5 0.5 # texture coordinates are skipped
+f 1 2 3 # a triangle
+f 1/1 3/1 4/1#a triangle with texture indices
+f -4 -2 -1 # relative indices
+"""
+
+def testTrailingComments(tmp_path): # comments after vertex and face lines, and whole comment lines, are ignored
+    path = tmp_path / "commented.obj"
+    path.write_bytes(commentedObj)
+    vertices, faces = parseObj(str(path))
+    assert np.array_equal(vertices, [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]])
+    assert np.array_equal(faces, [[0, 1, 2], [0, 2, 3], [0, 2, 3]])
+
+def testCommentsMatchUncommented(): # a file with comments parses the same as the file with them removed
+    stripped = b"\n".join(line.split(b"#")[0] for line in commentedObj.split(b"\n"))
+    for commented, plain in zip(parseChunk(commentedObj), parseChunk(stripped)):
+        assert np.array_equal(commented, plain)
+
+def testMalformedLine(): # text that is not a comment still makes a vertex line invalid
+    with pytest.raises(ValueError):
+        parseChunk(b"v 0 0 zero\n")
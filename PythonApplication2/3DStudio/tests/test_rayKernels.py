@@ -0,0 +1,77 @@
+# import necessary libraries
+import numpy as np
+import pytest
+import rayKernels
+from rayKernels import hitSpheres, hitTriangles
+from staticRenderer import Ray, Sphere, Triangle
+from utilities import *
+
+# the batched kernels are checked against Ray.hitSphere and Ray.hitTriangle, which remain the reference implementation
+
+def closestScalarHit(origin, direction, shapes, hitFunction): # returns the distance and index of the closest hit found by a linear scan
+    # Ray normalises its direction again, so distances can differ from the kernels' in the last bits
+    ray = Ray(Vect(*origin), Vect(*direction))
+    bestDist, bestIndex = np.inf, -1
+    for index, shape in enumerate(shapes):
+        hitInfo = hitFunction(ray, shape)
+        # only strictly closer hits replace earlier ones, as in StaticRenderer.findRayHit
+        if hitInfo.hit and hitInfo.dist < bestDist:
+            bestDist, bestIndex = hitInfo.dist, index
+    return (bestDist, bestIndex)
+
+def randomSpheres(rng, count):
+    centres = rng.uniform(-6, 6, (count, 3)) + [0, 0, -12]
+    radii = rng.uniform(0.2, 3, count)
+    # repeat the first spheres exactly, so rays hitting them tie and must keep the lowest index
+    return (np.concatenate((centres, centres[:3])), np.concatenate((radii, radii[:3])))
+
+def randomTriangles(rng, count):
+    p1 = rng.uniform(-6, 6, (count, 3)) + [0, 0, -12]
+    p2 = p1 + rng.uniform(-4, 4, (count, 3))
+    p3 = p1 + rng.uniform(-4, 4, (count, 3))
+    # repeat the first triangles exactly, so rays hitting them tie and must keep the lowest index
+    return (np.concatenate((p1, p1[:3])), np.concatenate((p2, p2[:3])), np.concatenate((p3, p3[:3])))
+
+@pytest.mark.parametrize("pairLimit", [rayKernels.pairLimit, 7]) # a small limit splits the primitives into many blocks
+def testSpheresMatchScalar(monkeypatch, randomRays, pairLimit):
+    monkeypatch.setattr(rayKernels, "pairLimit", pairLimit)
+    rng = np.random.default_rng(1)
+    origins, directions = randomRays(rng, 200)
+    centres, radii = randomSpheres(rng, 20)
+    spheres = [Sphere(Vect(*c), r, Vect(1, 1, 1), 0, 0) for c, r in zip(centres.tolist(), radii.tolist())]
+    dist, index, normals = hitSpheres(origins, directions, centres, radii)
+    expected = [closestScalarHit(o, d, spheres, Ray.hitSphere) for o, d in zip(origins.tolist(), directions.tolist())]
+    assert np.array_equal(index, [i for _, i in expected])
+    assert np.allclose(dist, [d for d, _ in expected], rtol=1e-12, atol=0)
+    # both hits and misses must be covered for the comparison to mean anything
+    assert (index == -1).any() and (index >= 0).any()
+    assert np.array_equal(normals[index == -1], np.zeros(((index == -1).sum(), 3)))
+
+@pytest.mark.parametrize("pairLimit", [rayKernels.pairLimit, 7])
+def testTrianglesMatchScalar(monkeypatch, randomRays, pairLimit):
+    monkeypatch.setattr(rayKernels, "pairLimit", pairLimit)
+    rng = np.random.default_rng(2)
+    origins, directions = randomRays(rng, 200)
+    p1, p2, p3 = randomTriangles(rng, 30)
+    triangles = [Triangle(Vect(*a), Vect(*b), Vect(*c), Vect(1, 1, 1), 0, 0) for a, b, c in zip(p1.tolist(), p2.tolist(), p3.tolist())]
+    dist, index, normals = hitTriangles(origins, directions, p1, p2 - p1, p3 - p1)
+    expected = [closestScalarHit(o, d, triangles, Ray.hitTriangle) for o, d in zip(origins.tolist(), directions.tolist())]
+    assert np.array_equal(index, [i for _, i in expected])
+    assert np.allclose(dist, [d for d, _ in expected], rtol=1e-12, atol=0)
+    assert (index == -1).any() and (index >= 0).any()
+
+def testTies(): # a ray hitting identical shapes takes the first, as a linear scan does
+    origins = np.zeros((1, 3))
+    directions = np.array([[0, 0, -1.0]])
+    _, index, _ = hitSpheres(origins, directions, np.array([[5, 0, -10.0], [0, 0, -10], [0, 0, -10]]), np.array([1, 1, 1.0]))
+    assert index.tolist() == [1]
+    p1 = np.array([[-1, -1, -5.0]] * 3)
+    edge = np.array([[2, 0, 0.0]] * 3)
+    _, index, _ = hitTriangles(origins, directions, p1, edge, np.array([[0, 2, 0.0]] * 3))
+    assert index.tolist() == [0]
+
+def testEmpty(): # rays with no shapes, or shapes with no rays, hit nothing
+    dist, index, normals = hitSpheres(np.zeros((2, 3)), np.array([[0, 0, -1.0]] * 2), np.zeros((0, 3)), np.zeros(0))
+    assert np.isinf(dist).all() and (index == -1).all()
+    dist, index, normals = hitTriangles(np.zeros((0, 3)), np.zeros((0, 3)), np.zeros((1, 3)), np.ones((1, 3)), np.ones((1, 3)))
+    assert len(dist) == 0
@@ -1,10 +1,15 @@
 import time
 import math
+import numbers
 import random
 import re
 import os
+import numpy as np
 
 class Vect: # class for a 3D vector
+    # slots keep each vector small and make attribute access faster than a per-instance dictionary
+    __slots__ = ("x", "y", "z")
+
     def __init__(self, x, y, z):
         self.x = x
         self.y = y
@@ -12,72 +17,142 @@ class Vect: # class for a 3D vector
 
     def __repr__(self):
         return f"({self.x}, {self.y}, {self.z})"
+
+    def __getstate__(self): # pickles the vector as a dictionary, the same as vectors saved before slots were used
+        return {"x": self.x, "y": self.y, "z": self.z}
+
+    def __setstate__(self, state): # restores a pickled vector, from either a dictionary or a (dictionary, slots) pair
+        if type(state) == tuple:
+            state = {**(state[0] or {}), **(state[1] or {})}
+        self.x = state["x"]
+        self.y = state["y"]
+        self.z = state["z"]
         
+    # operators check for exact types first as they are the common case, then accept any other real number such as numpy scalars
     def __add__(self, add): # method for adding the vector to either a scalar or another vector
-        if type(add) == Vect:
+        kind = type(add)
+        if kind is Vect:
             return Vect(self.x + add.x, self.y + add.y, self.z + add.z)
         
-        elif type(add) == int or type(add) == float:
+        elif kind is float or kind is int or isinstance(add, numbers.Real):
             return Vect(self.x + add, self.y + add, self.z + add)
         
         return self
 
     def __sub__(self, sub): # method for subtracting a vector or scalar from the vector
-        if type(sub) == Vect:
+        kind = type(sub)
+        if kind is Vect:
             return Vect(self.x - sub.x, self.y - sub.y, self.z - sub.z)
         
-        elif type(sub) == int or type(sub) == float:
+        elif kind is float or kind is int or isinstance(sub, numbers.Real):
             return Vect(self.x - sub, self.y - sub, self.z - sub)
         
         return self
 
     def __mul__(self, mul): # method for multiplication by scalar
-        if type(mul) == int or type(mul) == float:
+        kind = type(mul)
+        if kind is float or kind is int:
             return Vect(self.x * mul, self.y * mul, self.z * mul)
         
-        if type(mul) == Vect:
+        if kind is Vect:
             return Vect(self.x * mul.x, self.y * mul.y, self.z * mul.z)
 
+        if isinstance(mul, numbers.Real):
+            return Vect(self.x * mul, self.y * mul, self.z * mul)
+
         return self
     
     def __truediv__(self, div): # method for division by scalar
-        if type(div) == int or type(div) == float:
+        kind = type(div)
+        if kind is float or kind is int:
             return Vect(self.x / div, self.y / div, self.z / div)
         
-        if type(div) == Vect:
+        if kind is Vect:
             return Vect(self.x / div.x, self.y / div.y, self.z / div.z)
 
+        if isinstance(div, numbers.Real):
+            return Vect(self.x / div, self.y / div, self.z / div)
+
+        return self
+
+    # in-place operators update the vector itself instead of allocating a new one, for accumulating in loops
+    # only use them on vectors that are not shared, as every reference to the vector sees the change
+    def __iadd__(self, add):
+        kind = type(add)
+        if kind is Vect:
+            self.x += add.x
+            self.y += add.y
+            self.z += add.z
+        elif kind is float or kind is int or isinstance(add, numbers.Real):
+            self.x += add
+            self.y += add
+            self.z += add
+        return self
+
+    def __isub__(self, sub):
+        kind = type(sub)
+        if kind is Vect:
+            self.x -= sub.x
+            self.y -= sub.y
+            self.z -= sub.z
+        elif kind is float or kind is int or isinstance(sub, numbers.Real):
+            self.x -= sub
+            self.y -= sub
+            self.z -= sub
+        return self
+
+    def __imul__(self, mul):
+        kind = type(mul)
+        if kind is Vect:
+            self.x *= mul.x
+            self.y *= mul.y
+            self.z *= mul.z
+        elif kind is float or kind is int or isinstance(mul, numbers.Real):
+            self.x *= mul
+            self.y *= mul
+            self.z *= mul
+        return self
+
+    def __itruediv__(self, div):
+        kind = type(div)
+        if kind is Vect:
+            self.x /= div.x
+            self.y /= div.y
+            self.z /= div.z
+        elif kind is float or kind is int or isinstance(div, numbers.Real):
+            self.x /= div
+            self.y /= div
+            self.z /= div
         return self
 
     def dot(self, dotVect): # method for calculating the dot product of the vector with another vector
-        if type(dotVect) == Vect:
+        if type(dotVect) is Vect:
             return (self.x * dotVect.x) + (self.y * dotVect.y) + (self.z * dotVect.z)
 
     def mag(self): # returns the magnitude of the vector
-        return math.sqrt((self.x ** 2) + (self.y ** 2) + (self.z ** 2))
+        return math.sqrt((self.x * self.x) + (self.y * self.y) + (self.z * self.z))
 
     def angle(self, angleVect): # calculates the angle between the vector and another vector
-        if type(angleVect) == Vect:
+        if type(angleVect) is Vect:
             # use dot product formula for angle
             radians = math.acos(self.dot(angleVect) / (self.mag() * angleVect.mag()))
             # convert to degrees from radians
             return radians * (180 / math.pi)
 
     def cross(self, crossVect): # calculates the cross product between the vector and another vector
-        if type(crossVect) == Vect:
+        if type(crossVect) is Vect:
             return Vect((self.y * crossVect.z - self.z * crossVect.y),
                         (self.z * crossVect.x - self.x * crossVect.z),
                         (self.x * crossVect.y - self.y * crossVect.x))
         
     def normalise(self): # returns a unit vector in the same direction as the original vector
-        if self.mag() == 0:
+        mag = self.mag()
+        if mag == 0:
             # prevents division by zero errors
             return self
         
         # return vector with magnitude 1
-        return Vect((self.x / self.mag()),
-                    (self.y / self.mag()),
-                    (self.z / self.mag()))
+        return Vect(self.x / mag, self.y / mag, self.z / mag)
     
     def roundTuple(self): # return x,y,z as a tuple of integers
         return (round(self.x), round(self.y), round(self.z))
@@ -85,6 +160,130 @@ class Vect: # class for a 3D vector
     def returnArray(self): # return x,y,z as an array
         return [self.x, self.y, self.z]
 
+class VectorBatch: # class for many 3D vectors stored as the rows of an (N, 3) array, with the same operations as Vect applied to every row
+    __slots__ = ("array",)
+    __array_ufunc__ = None # makes numpy scalars and arrays on the left of an operator defer to the batch's reflected operators
+
+    def __init__(self, array):
+        self.array = np.asarray(array, dtype=np.float64).reshape(-1, 3)
+
+    @staticmethod
+    def fromVects(vects): # packs a list of Vect objects into a batch
+        return VectorBatch([(v.x, v.y, v.z) for v in vects])
+
+    def __repr__(self):
+        return f"VectorBatch({self.array.tolist()})"
+
+    def __len__(self): # returns the number of vectors
+        return len(self.array)
+
+    def __getitem__(self, index): # returns a single vector as a Vect, or a selection of vectors as a batch
+        if isinstance(index, numbers.Integral):
+            x, y, z = self.array[index].tolist()
+            return Vect(x, y, z)
+        return VectorBatch(self.array[index])
+
+    def __iter__(self): # iterates over the vectors as Vect objects
+        for x, y, z in self.array.tolist():
+            yield Vect(x, y, z)
+
+    @property
+    def x(self):
+        return self.array[:, 0]
+
+    @property
+    def y(self):
+        return self.array[:, 1]
+
+    @property
+    def z(self):
+        return self.array[:, 2]
+
+    def operand(self, other): # converts the other side of an operator to an array that broadcasts against the rows, or None if unsupported
+        kind = type(other)
+        if kind is VectorBatch:
+            return other.array
+        if kind is Vect:
+            return np.array((other.x, other.y, other.z), dtype=np.float64)
+        if kind is float or kind is int or isinstance(other, numbers.Real):
+            return other
+        if kind is np.ndarray:
+            # a 1D array holds one scalar per vector
+            return other[:, None] if other.ndim == 1 else other
+        return None
+
+    # operators apply to every vector, with another batch or array applied row by row
+    # as with Vect, unsupported operands leave the batch unchanged
+    def __add__(self, add):
+        add = self.operand(add)
+        return self if add is None else VectorBatch(self.array + add)
+
+    def __sub__(self, sub):
+        sub = self.operand(sub)
+        return self if sub is None else VectorBatch(self.array - sub)
+
+    def __mul__(self, mul):
+        mul = self.operand(mul)
+        return self if mul is None else VectorBatch(self.array * mul)
+
+    def __truediv__(self, div):
+        div = self.operand(div)
+        return self if div is None else VectorBatch(self.array / div)
+
+    __radd__ = __add__
+    __rmul__ = __mul__
+
+    def __iadd__(self, add):
+        add = self.operand(add)
+        if add is not None:
+            self.array += add
+        return self
+
+    def __isub__(self, sub):
+        sub = self.operand(sub)
+        if sub is not None:
+            self.array -= sub
+        return self
+
+    def __imul__(self, mul):
+        mul = self.operand(mul)
+        if mul is not None:
+            self.array *= mul
+        return self
+
+    def __itruediv__(self, div):
+        div = self.operand(div)
+        if div is not None:
+            self.array /= div
+        return self
+
+    def dot(self, dotVect): # returns the dot product of every vector, summed in the same order as Vect.dot
+        other = self.operand(dotVect)
+        if other is not None:
+            a, b = self.array, np.broadcast_to(other, self.array.shape)
+            return a[:, 0] * b[:, 0] + a[:, 1] * b[:, 1] + a[:, 2] * b[:, 2]
+
+    def mag(self): # returns the magnitude of every vector
+        return np.sqrt(self.dot(self))
+
+    def cross(self, crossVect): # returns the cross product of every vector, matching Vect.cross
+        other = self.operand(crossVect)
+        if other is not None:
+            a, b = self.array, np.broadcast_to(other, self.array.shape)
+            return VectorBatch(np.stack((a[:, 1] * b[:, 2] - a[:, 2] * b[:, 1],
+                                         a[:, 2] * b[:, 0] - a[:, 0] * b[:, 2],
+                                         a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]), axis=1))
+
+    def normalise(self): # returns unit vectors in the same directions, leaving zero vectors unchanged like Vect.normalise
+        mag = self.mag()[:, None]
+        return VectorBatch(np.divide(self.array, mag, out=self.array.copy(), where=mag != 0))
+
+    def roundTuple(self): # return every vector as a tuple of integers, rounding halves to even like round()
+        return [tuple(row) for row in np.rint(self.array).astype(np.int64).tolist()]
+
+    def returnArray(self): # return every vector as an [x, y, z] list
+        return self.array.tolist()
+
 def uiHide(elements): # method to hide any number of ui elements at once
     for element in elements:
         element.hide()
@@ -181,6 +380,13 @@ def unnest(nested): # function to remove nesting in an array of any dimension
             temp.append(i) # append non-list items directly
     return temp # return flattened list
 
+def mortonCode(x, y): # interleaves the bits of two non-negative integers to give their position along a z-order curve
+    code = 0
+    for bit in range(16):
+        code |= ((x >> bit) & 1) << (2 * bit)
+        code |= ((y >> bit) & 1) << (2 * bit + 1)
+    return code
+
 def calculateDistance(p1, p2): # calculates distance between 2 points in 3d space
     return math.sqrt((p2.x - p1.x)**2 + (p2.y - p1.y)**2 + (p2.z - p1.z)**2)
 
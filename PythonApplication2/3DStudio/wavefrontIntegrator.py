@@ -0,0 +1,66 @@
+# import necessary libraries
+import numpy as np
+from rayKernels import dot, normalise
+
+# alternative to StaticRenderer.pixelShader that traces every path of a tile together
+# path state is kept as arrays (structure of arrays) and all live paths advance one bounce at a time
+
+def cameraRays(x0, y0, tileWidth, tileHeight, samples, width, height, sampler): # returns origins and directions of the camera rays for every sample of a tile
+    # pixel coordinates of each path, ordered by row, then column, then sample
+    xs, ys = np.meshgrid(np.arange(x0, x0 + tileWidth), np.arange(y0, y0 + tileHeight))
+    xs = np.repeat(xs.ravel(), samples)
+    ys = np.repeat(ys.ravel(), samples)
+    count = len(xs)
+    # convert pixel coordinates to normalised coordinates for direction vector of rays
+    coords = np.empty((count, 3))
+    coords[:, 0] = (xs / width * 2 - 1) * (width / height) # adjust for aspect ratio of screen
+    coords[:, 1] = (height - ys) / height * 2 - 1
+    coords[:, 2] = -1.0
+    # add a small amount of random blur for anti-aliasing
+    coords += (sampler.uniform(np.arange(count), 0) * 2 - 1) * 0.002
+    return (np.zeros((count, 3)), normalise(coords))
+
+def tracePaths(scene, origins, directions, maxBounces, skyTint, skyLight, sampler): # traces all paths through the scene, returning the light gathered by each
+    count = len(origins)
+    light = np.zeros((count, 3))
+    # state of the live paths only, alongside the index of the path each entry belongs to
+    paths = np.arange(count)
+    colour = np.ones((count, 3))
+    cos = np.ones(count)
+    skyTint = np.array(skyTint, dtype=np.float64)
+
+    # advance every live path by one bounce at a time, up to the specified maximum
+    for bounce in range(maxBounces):
+        if len(paths) == 0:
+            break
+        # find closest intersection of every ray with an object
+        dist, normal, hitColour, shine, emission = scene.findRayHits(origins, directions)
+        hit = np.isfinite(dist)
+
+        # paths that miss gather environment light based on ray direction and terminate
+        miss = ~hit
+        skyAmt = skyLight / ((directions[miss, 1] + 1.2) ** 2)
+        light[paths[miss]] += colour[miss] * (skyAmt[:, None] * skyTint) * cos[miss, None]
+
+        # compact the state so only paths that hit something remain
+        paths, origins, directions, colour = paths[hit], origins[hit], directions[hit], colour[hit]
+        dist, normal, hitColour, shine, emission = dist[hit], normal[hit], hitColour[hit], shine[hit], emission[hit]
+
+        # gather object colour and any emitted light
+        colour *= hitColour
+        light[paths] += colour * emission[:, None]
+        # offset origin slightly to prevent intersection with the same object again
+        origins = origins + directions * dist[:, None] + normal * 0.01
+        # weighted average of perfect reflection and random scattering based on each object's shine property
+        reflect = normalise(directions - normal * 2 * dot(directions, normal)[:, None])
+        scatter = normalise((sampler.uniform(paths, bounce + 1) * 2 - 1) + normal)
+        directions = (reflect * shine[:, None] + scatter * (1 - shine)[:, None]) / 2
+        # apply cos weighting
+        cos = np.maximum(dot(normal, directions), 0) * 2
+
+    return light * 1.5
+
+def shadeTile(scene, x0, y0, tileWidth, tileHeight, samples, maxBounces, width, height, skyTint, skyLight, sampler): # returns the summed samples of a tile as a float32 block
+    origins, directions = cameraRays(x0, y0, tileWidth, tileHeight, samples, width, height, sampler)
+    light = tracePaths(scene, origins, directions, maxBounces, skyTint, skyLight, sampler)
+    return light.reshape(tileHeight, tileWidth, samples, 3).sum(axis=2).astype(np.float32)